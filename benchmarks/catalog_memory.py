@@ -0,0 +1,83 @@
+"""Memory benchmark: document rows plus a dict tree vs. DocumentCatalog.
+
+Run from the project root:
+
+    python -m benchmarks.catalog_memory [document_count]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from database.db_manager import DatabaseManager
+from services.document_catalog import DocumentCatalog
+
+
+def build_database(path: str, count: int) -> int:
+    """Create a topic with count documents spread over nested folders."""
+    db = DatabaseManager(path)
+    topic_id = db.add_topic("Benchmark", "https://github.com/example/docs", "docs/benchmark")
+    db.add_documents(topic_id, (
+        {
+            'title': f"Getting Started With Feature {i}",
+            'filename': f"getting_started_with_feature_{i}.md",
+            'file_path': f"docs/benchmark/section_{i % 50}/chapter_{i % 7}/getting_started_with_feature_{i}.md",
+            'relative_path': f"section_{i % 50}/chapter_{i % 7}/getting_started_with_feature_{i}.md"
+        }
+        for i in range(count)
+    ))
+    db.close()
+    return topic_id
+
+
+def row_tree(rows) -> dict:
+    """The previous representation: nested dicts holding the rows."""
+    folder_structure = {}
+    for doc in rows:
+        parts = doc['relative_path'].replace('\\', '/').split('/')
+        current = folder_structure
+        for part in parts[:-1]:
+            current = current.setdefault(part, {})
+        current.setdefault('__files__', []).append(doc)
+    return folder_structure
+
+
+def measure(build):
+    """Return (bytes retained, seconds) for the structure build() returns."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, elapsed
+
+
+def main(count: int = 50000):
+    """Compare both representations for one topic of count documents."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "benchmark.db")
+        topic_id = build_database(path, count)
+        db = DatabaseManager(path)
+        # Skip the metadata cache so each build reads fresh rows
+        load_rows = lambda: db.get_connection().execute("""
+            SELECT id, topic_id, title, relative_path, is_read FROM documents
+            WHERE topic_id = ? ORDER BY relative_path
+        """, (topic_id,)).fetchall()
+
+        rows_bytes, rows_time = measure(lambda: (lambda rows: (rows, row_tree(rows)))(load_rows()))
+        catalog_bytes, catalog_time = measure(lambda: DocumentCatalog(topic_id, load_rows()))
+        db.close()
+
+    print(f"{count} documents")
+    print(f"  rows + dict tree: {rows_bytes / 1024 / 1024:7.2f} MiB  {rows_time * 1000:7.1f} ms")
+    print(f"  DocumentCatalog:  {catalog_bytes / 1024 / 1024:7.2f} MiB  {catalog_time * 1000:7.1f} ms")
+    print(f"  saved: {(1 - catalog_bytes / rows_bytes) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -1,29 +1,216 @@
 import sqlite3
 import os
+import re
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Callable
+from database.metadata_cache import MetadataCache
 
 
 class DatabaseManager:
-    """Manages SQLite database for DevDocs application."""
+    """Manages SQLite database for DevDocs application.
+
+    Each thread gets its own long-lived connection, opened on first use and
+    kept until close(). The database runs in WAL mode so readers on the UI
+    thread are never blocked by a sync writing in a background thread.
+
+    Small writes from the UI (read state) can be queued instead of run
+    inline; a background writer thread applies them in batched transactions
+    every WRITE_FLUSH_INTERVAL seconds, and close() flushes what is left.
+
+    Topic and document rows are served through a read-through MetadataCache
+    (self.cache); every write method invalidates exactly the entries whose
+    rows it changed.
+    """
+
+    # Seconds a writer waits for another writer's lock before failing
+    BUSY_TIMEOUT = 10
+    # Page cache per connection, in KiB (negative cache_size means KiB)
+    CACHE_SIZE_KB = 16 * 1024
+    # Compiled statements cached per connection for reuse
+    STATEMENT_CACHE_SIZE = 256
+    # Memory cap of the topic/document metadata cache, in bytes
+    CACHE_MAX_BYTES = 8 * 1024 * 1024
+    # Seconds queued writes are collected before the writer applies them
+    WRITE_FLUSH_INTERVAL = 0.25
+    # Markers placed around matched terms in search snippets
+    SNIPPET_MARKERS = ("«", "»")
+    # Tokens shown around the match in a search snippet
+    SNIPPET_TOKENS = 12
 
     def __init__(self, db_path: str = "devdocs.db"):
         """Initialize database manager with given path."""
         self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Queued writes by coalescing key, applied in insertion order
+        self._pending_writes = {}
+        self._pending_lock = threading.Lock()
+        self._write_event = threading.Event()
+        self._writer_thread = None
+        self._closing = False
+        self.cache = MetadataCache(self.CACHE_MAX_BYTES)
         self.init_database()
 
     def get_connection(self):
-        """Get database connection."""
-        conn = sqlite3.connect(self.db_path)
+        """Get this thread's database connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _open_connection(self):
+        """Open and tune a new connection."""
+        # check_same_thread is off only so close() can run from the UI thread;
+        # each connection is otherwise used by the thread that opened it
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT,
+                               check_same_thread=False,
+                               cached_statements=self.STATEMENT_CACHE_SIZE)
         conn.row_factory = sqlite3.Row
+        # Must precede WAL to apply to a new database; existing databases
+        # without it are converted at startup by init_database()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{self.CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        # Off by default in SQLite; needed for ON DELETE CASCADE
+        conn.execute("PRAGMA foreign_keys = ON")
         return conn
 
+    def close(self):
+        """Apply queued writes, then close every connection opened by this manager."""
+        self._closing = True
+        self._write_event.set()
+        if self._writer_thread is not None:
+            self._writer_thread.join()
+            self._writer_thread = None
+        try:
+            self.flush()
+        finally:
+            with self._connections_lock:
+                connections, self._connections = self._connections, []
+            for conn in connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._local = threading.local()
+            self._closing = False
+
+    def queue_write(self, sql: str, params: tuple = (), key=None, invalidate: Optional[Callable] = None):
+        """Queue a small write for the background writer and return immediately.
+
+        A later write queued with the same key replaces an earlier one that
+        has not been applied yet. Reads may not see a queued write until it
+        is flushed (at most WRITE_FLUSH_INTERVAL later, or by flush()).
+        invalidate is called once the write is committed, to drop cached rows.
+        """
+        with self._pending_lock:
+            if key is None:
+                key = object()
+            self._pending_writes.pop(key, None)
+            self._pending_writes[key] = (sql, params, invalidate)
+            if self._writer_thread is None and not self._closing:
+                self._writer_thread = threading.Thread(target=self._write_loop, name="db-writer", daemon=True)
+                self._writer_thread.start()
+        self._write_event.set()
+
+    def flush(self):
+        """Apply all queued writes now, in one transaction, on the calling thread."""
+        with self._pending_lock:
+            pending, self._pending_writes = self._pending_writes, {}
+        if not pending:
+            return
+        try:
+            with self.transaction() as cursor:
+                for sql, params, _ in pending.values():
+                    cursor.execute(sql, params)
+        except sqlite3.Error:
+            # Put the batch back ahead of newer writes, dropping superseded ones, to retry later
+            with self._pending_lock:
+                for key in self._pending_writes:
+                    pending.pop(key, None)
+                pending.update(self._pending_writes)
+                self._pending_writes = pending
+            raise
+
+        for _, _, invalidate in pending.values():
+            if invalidate is not None:
+                invalidate()
+
+    def _write_loop(self):
+        """Background writer: apply queued writes in batches until close()."""
+        while not self._closing:
+            self._write_event.wait()
+            # Let a burst of writes collect into one transaction
+            time.sleep(self.WRITE_FLUSH_INTERVAL)
+            self._write_event.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Database busy or locked; retried on the next pass
+                self._write_event.set()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in one transaction on this thread's connection.
+
+        Commits when the block succeeds and rolls back if it raises, so a
+        failed write never leaves the long-lived connection mid-transaction.
+        """
+        conn = self.get_connection()
+        with conn:
+            yield conn.cursor()
+
     def init_database(self):
-        """Create database tables if they don't exist."""
+        """Create the schema or upgrade it to the latest version.
+
+        PRAGMA user_version records how many entries of _migrations() have
+        been applied; each pending migration runs in its own transaction.
+        Migrations are idempotent so databases created before versioning
+        upgrade cleanly from version 0. A database created without
+        incremental auto_vacuum is then converted with a one-time full
+        VACUUM, here rather than in the background because the rebuild
+        holds the write lock throughout.
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for number, migration in enumerate(self._migrations(), 1):
+            if number <= version:
+                continue
+            with self.transaction() as cursor:
+                cursor.execute("BEGIN")
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {number}")
+
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # auto_vacuum = INCREMENTAL was set when the connection was opened
+            conn.execute("VACUUM")
 
+    def _migrations(self) -> list:
+        """Schema migrations in the order they must be applied."""
+        return [
+            self._migrate_base_tables,
+            self._migrate_sync_columns,
+            self._migrate_unique_document_paths,
+            self._migrate_document_indexes,
+            self._migrate_topic_counters,
+            self._migrate_full_text_search,
+            self._migrate_document_metadata,
+            self._migrate_reextract_metadata,
+        ]
+
+    def _migrate_base_tables(self, cursor):
+        """Version 1: topics and documents tables."""
         # Topics table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS topics (
@@ -53,126 +240,738 @@ class DatabaseManager:
             )
         """)
 
-        conn.commit()
-        conn.close()
+    def _migrate_sync_columns(self, cursor):
+        """Version 2: branch, HTTP validators and document fingerprints."""
+        self._ensure_column(cursor, "topics", "branch", "TEXT")
+        self._ensure_column(cursor, "topics", "etag", "TEXT")
+        self._ensure_column(cursor, "topics", "last_modified", "TEXT")
+        self._ensure_column(cursor, "topics", "archive_size", "INTEGER")
+        self._ensure_column(cursor, "documents", "crc32", "INTEGER")
+        self._ensure_column(cursor, "documents", "file_size", "INTEGER")
 
-    def add_topic(self, name: str, github_url: str, local_path: str, subfolder: Optional[str] = None):
-        """Add a new documentation topic."""
+    def _migrate_unique_document_paths(self, cursor):
+        """Version 3: sync upserts documents by relative path within a topic."""
+        cursor.execute("""
+            DELETE FROM documents
+            WHERE id NOT IN (SELECT MIN(id) FROM documents GROUP BY topic_id, relative_path)
+        """)
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_topic_path
+            ON documents (topic_id, relative_path)
+        """)
+
+    def _migrate_document_indexes(self, cursor):
+        """Version 4: covering indexes for the document tree and unread counts."""
+        # get_topic_documents: WHERE topic_id = ? ORDER BY relative_path, reading
+        # only indexed columns (the rowid id is part of every index)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_documents_topic_tree
+            ON documents (topic_id, relative_path, title, is_read)
+        """)
+        # get_unread_count: WHERE topic_id = ? AND is_read = 0
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_documents_topic_unread
+            ON documents (topic_id, is_read)
+        """)
+        cursor.execute("ANALYZE")
+
+    def _migrate_topic_counters(self, cursor):
+        """Version 5: per-topic document and unread counters kept by triggers."""
+        self._ensure_column(cursor, "topics", "doc_count", "INTEGER NOT NULL DEFAULT 0")
+        self._ensure_column(cursor, "topics", "unread_count", "INTEGER NOT NULL DEFAULT 0")
+
+        # Every write path (single, bulk and upsert) goes through these, so the
+        # counters never drift from the documents table
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_count_insert
+            AFTER INSERT ON documents
+            BEGIN
+                UPDATE topics
+                SET doc_count = doc_count + 1,
+                    unread_count = unread_count + (NEW.is_read IS 0)
+                WHERE id = NEW.topic_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_count_delete
+            AFTER DELETE ON documents
+            BEGIN
+                UPDATE topics
+                SET doc_count = doc_count - 1,
+                    unread_count = unread_count - (OLD.is_read IS 0)
+                WHERE id = OLD.topic_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_count_update
+            AFTER UPDATE OF is_read, topic_id ON documents
+            WHEN OLD.is_read IS NOT NEW.is_read OR OLD.topic_id IS NOT NEW.topic_id
+            BEGIN
+                UPDATE topics
+                SET doc_count = doc_count - 1,
+                    unread_count = unread_count - (OLD.is_read IS 0)
+                WHERE id = OLD.topic_id;
+                UPDATE topics
+                SET doc_count = doc_count + 1,
+                    unread_count = unread_count + (NEW.is_read IS 0)
+                WHERE id = NEW.topic_id;
+            END
+        """)
+
+        # Backfill counters for existing documents
+        cursor.execute("""
+            UPDATE topics SET
+                doc_count = (SELECT COUNT(*) FROM documents WHERE topic_id = topics.id),
+                unread_count = (SELECT COUNT(*) FROM documents WHERE topic_id = topics.id AND is_read = 0)
+        """)
+
+    def _migrate_full_text_search(self, cursor):
+        """Version 6: FTS5 index over document titles, headings, paths and text.
+
+        Rows share their rowid with documents. Sync fills the index; deleting
+        a document removes its row. Skipped when SQLite lacks FTS5, in which
+        case search falls back to matching paths.
+        """
+        # The topic column holds a "topic<id>" token so a topic filter is part
+        # of the MATCH and only that topic's hits get ranked
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                    title, headings, path, body, topic,
+                    prefix = '2 3',
+                    tokenize = 'porter unicode61'
+                )
+            """)
+        except sqlite3.OperationalError:
+            return
+        # Default ranking: BM25 weighted towards titles and headings
+        cursor.execute("""
+            INSERT INTO documents_fts (documents_fts, rank)
+            VALUES ('rank', 'bm25(10.0, 5.0, 3.0, 1.0, 0.0)')
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_fts_delete
+            AFTER DELETE ON documents
+            BEGIN
+                DELETE FROM documents_fts WHERE rowid = OLD.id;
+            END
+        """)
+
+    def _migrate_document_metadata(self, cursor):
+        """Version 7: metadata extracted from document content at sync time.
+
+        document_metadata records the fingerprint the metadata was extracted
+        from, so documents whose content changed since are found by query.
+        All rows go away with their document.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_metadata (
+                document_id INTEGER PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+                topic_id INTEGER NOT NULL,
+                word_count INTEGER NOT NULL,
+                heading_count INTEGER NOT NULL,
+                crc32 INTEGER,
+                file_size INTEGER
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_document_metadata_topic
+            ON document_metadata (topic_id, word_count)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_headings (
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                level INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                PRIMARY KEY (document_id, position)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_code_languages (
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                language TEXT NOT NULL,
+                block_count INTEGER NOT NULL,
+                PRIMARY KEY (document_id, language)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_document_code_languages_language
+            ON document_code_languages (language, document_id)
+        """)
+
+    def _migrate_reextract_metadata(self, cursor):
+        """Version 8: re-extract metadata once setext headings are recognized.
+
+        Dropping the rows marks every document's metadata as missing, so the
+        next sync of each topic extracts titles, outlines and the search
+        index again.
+        """
+        cursor.execute("DELETE FROM document_metadata")
+
+    def analyze(self):
+        """Refresh query planner statistics (run after bulk loads)."""
+        conn = self.get_connection()
+        # Sample a bounded number of rows per index so this stays fast on big tables
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE")
+
+    def count_orphans(self) -> int:
+        """Count document and search index rows whose topic or document no longer exists."""
         conn = self.get_connection()
         cursor = conn.cursor()
-        try:
+        cursor.execute("SELECT COUNT(*) FROM documents WHERE topic_id NOT IN (SELECT id FROM topics)")
+        count = cursor.fetchone()[0]
+        if self.has_full_text_search():
+            cursor.execute("SELECT COUNT(*) FROM documents_fts WHERE rowid NOT IN (SELECT id FROM documents)")
+            count += cursor.fetchone()[0]
+        return count
+
+    def delete_orphans(self) -> int:
+        """Delete document and search index rows left behind by deleted topics.
+
+        Returns the number of rows deleted.
+        """
+        with self.transaction() as cursor:
+            cursor.execute("SELECT DISTINCT topic_id FROM documents WHERE topic_id NOT IN (SELECT id FROM topics)")
+            topic_ids = [row['topic_id'] for row in cursor.fetchall()]
+            cursor.execute("DELETE FROM documents WHERE topic_id NOT IN (SELECT id FROM topics)")
+            deleted = cursor.rowcount
+            if self.has_full_text_search():
+                cursor.execute("DELETE FROM documents_fts WHERE rowid NOT IN (SELECT id FROM documents)")
+                deleted += cursor.rowcount
+        for topic_id in topic_ids:
+            self._invalidate_documents(topic_id)
+        return deleted
+
+    def get_free_bytes(self) -> int:
+        """Bytes held by free pages in the database file."""
+        conn = self.get_connection()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_size * conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def reclaim_space(self, step_pages: int = 256, should_stop: Optional[Callable] = None) -> int:
+        """Return free pages to the filesystem; returns the bytes reclaimed.
+
+        Pages are released with incremental vacuum, step_pages at a time so
+        other writers are never locked out for long. should_stop is checked
+        between steps. Nothing is released if the database is not in
+        incremental auto_vacuum mode (see init_database). Only the shrink of
+        the main database file counts as reclaimed; the write-ahead log
+        grows back with use.
+        """
+        conn = self.get_connection()
+        size_before = self._database_size()
+
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+                if should_stop is not None and should_stop():
+                    break
+                conn.execute(f"PRAGMA incremental_vacuum({int(step_pages)})").fetchall()
+
+        # Vacuumed pages reach the main file at checkpoint; this also shrinks the write-ahead log
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return max(0, size_before - self._database_size())
+
+    def _database_size(self) -> int:
+        """Size of the main database file, in bytes."""
+        return os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+
+    def get_document_file_paths(self, topic_id: int) -> set:
+        """Get the absolute, normalized local file paths of a topic's documents."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT file_path FROM documents WHERE topic_id = ?", (topic_id,))
+        paths = {os.path.normpath(os.path.abspath(row['file_path'])) for row in cursor.fetchall()}
+        return paths
+
+    @staticmethod
+    def _ensure_column(cursor, table: str, column: str, definition: str):
+        """Add a column to an existing table if it is missing."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def add_topic(self, name: str, github_url: str, local_path: str, subfolder: Optional[str] = None):
+        """Add a new documentation topic."""
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO topics (name, github_url, local_path, subfolder)
                 VALUES (?, ?, ?, ?)
             """, (name, github_url, local_path, subfolder))
-            conn.commit()
             topic_id = cursor.lastrowid
-            return topic_id
-        finally:
-            conn.close()
+        self.cache.invalidate(('topics',), ('topic_stats',))
+        return topic_id
 
     def get_all_topics(self):
         """Get all topics."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM topics ORDER BY name")
-        topics = cursor.fetchall()
-        conn.close()
-        return topics
+        def load():
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM topics ORDER BY name")
+            return cursor.fetchall()
+        return self.cache.get_or_load(('topics',), load)
 
     def get_topic(self, topic_id: int):
         """Get a specific topic."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM topics WHERE id = ?", (topic_id,))
-        topic = cursor.fetchone()
-        conn.close()
-        return topic
+        def load():
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM topics WHERE id = ?", (topic_id,))
+            return cursor.fetchone()
+        return self.cache.get_or_load(('topic', topic_id), load)
 
     def delete_topic(self, topic_id: int):
         """Delete a topic and its documents."""
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM topics WHERE id = ?", (topic_id,))
+        self._invalidate_documents(topic_id)
+
+    def _invalidate_topic(self, topic_id: int):
+        """Drop cached rows showing a topic's columns or counters."""
+        self.cache.invalidate(('topic', topic_id), ('topics',), ('topic_stats',))
+
+    def _invalidate_documents(self, topic_id: int):
+        """Drop cached rows of a topic's documents, its listing and its counters."""
+        self.cache.invalidate_tag(('documents', topic_id))
+        self.cache.invalidate(('topic_documents', topic_id))
+        self._invalidate_topic(topic_id)
+
+    def _invalidate_document(self, doc_id: int):
+        """Drop cached rows showing a document's read state."""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM topics WHERE id = ?", (topic_id,))
-        conn.commit()
-        conn.close()
+        row = conn.execute("SELECT topic_id FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        self.cache.invalidate(('document', doc_id))
+        if row is not None:
+            self.cache.invalidate(('topic_documents', row['topic_id']))
+            self._invalidate_topic(row['topic_id'])
 
-    def add_document(self, topic_id: int, title: str, filename: str, file_path: str, relative_path: str):
+    def add_document(self, topic_id: int, title: str, filename: str, file_path: str, relative_path: str,
+                     crc32: Optional[int] = None, file_size: Optional[int] = None):
         """Add a new document."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
+        with self.transaction() as cursor:
             cursor.execute("""
-                INSERT INTO documents (topic_id, title, filename, file_path, relative_path)
-                VALUES (?, ?, ?, ?, ?)
-            """, (topic_id, title, filename, file_path, relative_path))
-            conn.commit()
-            return cursor.lastrowid
-        finally:
-            conn.close()
+                INSERT INTO documents (topic_id, title, filename, file_path, relative_path, crc32, file_size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (topic_id, title, filename, file_path, relative_path, crc32, file_size))
+            doc_id = cursor.lastrowid
+        self._invalidate_documents(topic_id)
+        return doc_id
+
+    def add_documents(self, topic_id: int, documents) -> int:
+        """Add many documents in a single transaction.
+
+        documents is an iterable of dicts with 'title', 'filename',
+        'file_path' and 'relative_path' keys, plus optional 'crc32' and
+        'file_size'. Returns the number of rows inserted.
+        """
+        rows = (
+            (topic_id, doc['title'], doc['filename'], doc['file_path'], doc['relative_path'],
+             doc.get('crc32'), doc.get('file_size'))
+            for doc in documents
+        )
+        with self.transaction() as cursor:
+            cursor.executemany("""
+                INSERT INTO documents (topic_id, title, filename, file_path, relative_path, crc32, file_size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            inserted = cursor.rowcount
+        self._invalidate_documents(topic_id)
+        self.analyze()
+        return inserted
+
+    def replace_topic_documents(self, topic_id: int, documents):
+        """Make a topic's document rows match documents in one transaction.
+
+        documents takes the same records as add_documents and is the
+        complete new document set. It is first written to a connection-private
+        staging table, then swapped in: rows no longer present are deleted and
+        the rest are upserted by relative_path. Rows whose path and
+        fingerprint did not change are not rewritten, so their id and read
+        state are kept, and readers never see the topic half-updated.
+        """
+        rows = (
+            (doc['title'], doc['filename'], doc['file_path'], doc['relative_path'],
+             doc.get('crc32'), doc.get('file_size'))
+            for doc in documents
+        )
+        with self.transaction() as cursor:
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS staged_documents (
+                    title TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    relative_path TEXT PRIMARY KEY,
+                    crc32 INTEGER,
+                    file_size INTEGER
+                )
+            """)
+            cursor.execute("DELETE FROM staged_documents")
+            cursor.executemany("""
+                INSERT OR REPLACE INTO staged_documents (title, filename, file_path, relative_path, crc32, file_size)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+
+        with self.transaction() as cursor:
+            cursor.execute("""
+                DELETE FROM documents
+                WHERE topic_id = ?
+                AND relative_path NOT IN (SELECT relative_path FROM staged_documents)
+            """, (topic_id,))
+            cursor.execute("""
+                INSERT INTO documents (topic_id, title, filename, file_path, relative_path, crc32, file_size)
+                SELECT ?, title, filename, file_path, relative_path, crc32, file_size
+                FROM staged_documents WHERE true
+                ON CONFLICT (topic_id, relative_path) DO UPDATE SET
+                    title = excluded.title,
+                    filename = excluded.filename,
+                    file_path = excluded.file_path,
+                    crc32 = excluded.crc32,
+                    file_size = excluded.file_size,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE documents.crc32 IS NOT excluded.crc32
+                OR documents.file_size IS NOT excluded.file_size
+                OR documents.file_path IS NOT excluded.file_path
+            """, (topic_id,))
+            cursor.execute("DELETE FROM staged_documents")
+        self._invalidate_documents(topic_id)
+        self.analyze()
 
     def get_topic_documents(self, topic_id: int):
-        """Get all documents for a topic."""
+        """Get all documents for a topic (the columns needed to list them).
+
+        Use get_document for a document's full row.
+        """
+        def load():
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, topic_id, title, relative_path, is_read FROM documents
+                WHERE topic_id = ?
+                ORDER BY relative_path
+            """, (topic_id,))
+            return cursor.fetchall()
+        return self.cache.get_or_load(('topic_documents', topic_id), load)
+
+    def has_full_text_search(self) -> bool:
+        """Check whether the FTS5 document index exists."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'")
+        return cursor.fetchone() is not None
+
+    def get_unindexed_documents(self, topic_id: int):
+        """Get id, relative_path and file_path of a topic's documents missing from the search index."""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT * FROM documents 
-            WHERE topic_id = ? 
-            ORDER BY relative_path
+            SELECT id, relative_path, file_path FROM documents
+            WHERE topic_id = ?
+            AND NOT EXISTS (SELECT 1 FROM documents_fts WHERE documents_fts.rowid = documents.id)
         """, (topic_id,))
         documents = cursor.fetchall()
-        conn.close()
         return documents
 
-    def get_document(self, doc_id: int):
-        """Get a specific document."""
+    def get_documents_without_metadata(self, topic_id: int):
+        """Get id, relative_path and file_path of a topic's documents with missing or outdated metadata."""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM documents WHERE id = ?", (doc_id,))
-        doc = cursor.fetchone()
-        conn.close()
-        return doc
+        cursor.execute("""
+            SELECT d.id, d.relative_path, d.file_path FROM documents d
+            LEFT JOIN document_metadata m ON m.document_id = d.id
+            WHERE d.topic_id = ?
+            AND (m.document_id IS NULL OR m.crc32 IS NOT d.crc32 OR m.file_size IS NOT d.file_size)
+        """, (topic_id,))
+        documents = cursor.fetchall()
+        return documents
 
-    def mark_as_read(self, doc_id: int, is_read: int = 1):
-        """Mark document as read/unread."""
+    def set_document_metadata(self, topic_id: int, documents) -> int:
+        """Store extracted metadata for documents in a single transaction.
+
+        documents is an iterable of dicts with 'relative_path', 'title',
+        'headings' ([{'level', 'title'}]), 'word_count' and 'languages'
+        ({language: block_count}) keys. The title replaces the document's
+        title; headings and languages replace what was stored before.
+        Returns the number of documents updated.
+        """
+        updated = 0
+        with self.transaction() as cursor:
+            for doc in documents:
+                cursor.execute("""
+                    SELECT id FROM documents WHERE topic_id = ? AND relative_path = ?
+                """, (topic_id, doc['relative_path']))
+                row = cursor.fetchone()
+                if row is None:
+                    continue
+                doc_id = row['id']
+
+                cursor.execute("""
+                    UPDATE documents SET title = ?
+                    WHERE id = ? AND title IS NOT ?
+                """, (doc['title'], doc_id, doc['title']))
+                cursor.execute("""
+                    INSERT OR REPLACE INTO document_metadata
+                        (document_id, topic_id, word_count, heading_count, crc32, file_size)
+                    SELECT id, topic_id, ?, ?, crc32, file_size FROM documents WHERE id = ?
+                """, (doc['word_count'], len(doc['headings']), doc_id))
+                cursor.execute("DELETE FROM document_headings WHERE document_id = ?", (doc_id,))
+                cursor.executemany("""
+                    INSERT INTO document_headings (document_id, position, level, title)
+                    VALUES (?, ?, ?, ?)
+                """, ((doc_id, position, heading['level'], heading['title'])
+                      for position, heading in enumerate(doc['headings'])))
+                cursor.execute("DELETE FROM document_code_languages WHERE document_id = ?", (doc_id,))
+                cursor.executemany("""
+                    INSERT INTO document_code_languages (document_id, language, block_count)
+                    VALUES (?, ?, ?)
+                """, ((doc_id, language, count) for language, count in doc['languages'].items()))
+                updated += 1
+        self._invalidate_documents(topic_id)
+        return updated
+
+    def get_document_outline(self, doc_id: int):
+        """Get a document's headings (level, title) in document order."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT level, title FROM document_headings
+            WHERE document_id = ?
+            ORDER BY position
+        """, (doc_id,))
+        headings = cursor.fetchall()
+        return headings
+
+    def get_topic_languages(self, topic_id: int):
+        """Get (language, doc_count) rows for the code in a topic's documents, most used first."""
+        def load():
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT l.language, COUNT(*) AS doc_count
+                FROM document_metadata m
+                JOIN document_code_languages l ON l.document_id = m.document_id
+                WHERE m.topic_id = ?
+                GROUP BY l.language
+                ORDER BY doc_count DESC, l.language
+            """, (topic_id,))
+            return cursor.fetchall()
+        return self.cache.get_or_load(('topic_languages', topic_id), load,
+                                      tags=lambda rows: [('documents', topic_id)])
+
+    def index_documents(self, topic_id: int, documents) -> int:
+        """Add or replace documents in the search index in a single transaction.
+
+        documents is an iterable of dicts with 'relative_path', 'title',
+        'headings' and 'body' keys. Returns the number of rows indexed.
+        """
+        rows = (
+            (doc['title'], doc['headings'], doc['relative_path'], doc['body'], f"topic{topic_id}",
+             topic_id, doc['relative_path'])
+            for doc in documents
+        )
+        with self.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO documents_fts (rowid, title, headings, path, body, topic)
+                SELECT id, ?, ?, ?, ?, ? FROM documents
+                WHERE topic_id = ? AND relative_path = ?
+            """, rows)
+            return cursor.rowcount
+
+    def search_documents(self, query: str, topic_id: Optional[int] = None, limit: int = 50,
+                         language: Optional[str] = None):
+        """Full-text search documents, best matches first.
+
+        Every word in query must match (as a prefix, so results update while
+        typing). Rows carry the listing columns plus a 'snippet' with matched
+        terms wrapped in SNIPPET_MARKERS and the BM25 'rank' (lower is
+        better). language limits hits to documents with code blocks in that
+        language; with an empty query it lists them all. Without FTS5, falls
+        back to matching relative paths.
+        """
+        match = self._fts_query(query)
+        if not match:
+            return self._search_language(language, topic_id, limit) if language else []
+        if not self.has_full_text_search():
+            return self._search_paths(query, topic_id, limit, language)
+        # Query words only match document text, never the topic token
+        match = f"{{title headings path body}} : ({match})"
+        if topic_id is not None:
+            match = f"topic : topic{int(topic_id)} AND {match}"
+
+        start, end = self.SNIPPET_MARKERS
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        # Rank inside FTS5 first so only the returned hits are joined; snippets
+        # come from the body, which also holds the title and heading text
+        cursor.execute("""
+            SELECT d.id, d.topic_id, d.title, d.relative_path, d.is_read, hits.snippet, hits.rank
+            FROM (
+                SELECT rowid, snippet(documents_fts, 3, ?, ?, '…', ?) AS snippet, rank
+                FROM documents_fts
+                WHERE documents_fts MATCH ?
+                AND (? IS NULL OR rowid IN (SELECT document_id FROM document_code_languages WHERE language = ?))
+                ORDER BY rank
+                LIMIT ?
+            ) hits
+            JOIN documents d ON d.id = hits.rowid
+            JOIN topics t ON t.id = d.topic_id
+            ORDER BY hits.rank
+        """, (start, end, self.SNIPPET_TOKENS, match, language, language, limit))
+        results = cursor.fetchall()
+        return results
+
+    def _search_paths(self, query: str, topic_id: Optional[int], limit: int, language: Optional[str] = None):
+        """Match documents whose relative path contains query."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT d.id, d.topic_id, d.title, d.relative_path, d.is_read,
+                   d.relative_path AS snippet, 0 AS rank
+            FROM documents d
+            JOIN topics t ON t.id = d.topic_id
+            WHERE d.relative_path LIKE '%' || ? || '%'
+            AND (? IS NULL OR d.topic_id = ?)
+            AND (? IS NULL OR d.id IN (SELECT document_id FROM document_code_languages WHERE language = ?))
+            ORDER BY d.relative_path
+            LIMIT ?
+        """, (query.strip(), topic_id, topic_id, language, language, limit))
+        results = cursor.fetchall()
+        return results
+
+    def _search_language(self, language: str, topic_id: Optional[int], limit: int):
+        """List documents with code blocks in language, most code blocks first."""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("""
-            UPDATE documents 
+            SELECT d.id, d.topic_id, d.title, d.relative_path, d.is_read,
+                   l.block_count || ' ' || l.language || ' code block'
+                       || CASE l.block_count WHEN 1 THEN '' ELSE 's' END AS snippet, 0 AS rank
+            FROM document_code_languages l
+            JOIN documents d ON d.id = l.document_id
+            JOIN topics t ON t.id = d.topic_id
+            WHERE l.language = ?
+            AND (? IS NULL OR d.topic_id = ?)
+            ORDER BY l.block_count DESC, d.relative_path
+            LIMIT ?
+        """, (language, topic_id, topic_id, limit))
+        results = cursor.fetchall()
+        return results
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """Turn free text into an FTS5 query: every word, as a quoted prefix."""
+        return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+    def get_document(self, doc_id: int):
+        """Get a specific document."""
+        def load():
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM documents WHERE id = ?", (doc_id,))
+            return cursor.fetchone()
+        # Tagged with its topic so writes to the topic's document set drop it
+        return self.cache.get_or_load(('document', doc_id), load,
+                                      tags=lambda doc: [('documents', doc['topic_id'])])
+
+    def mark_as_read(self, doc_id: int, is_read: int = 1):
+        """Mark document as read/unread."""
+        with self.transaction() as cursor:
+            cursor.execute("""
+                UPDATE documents 
+                SET is_read = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (is_read, doc_id))
+        self._invalidate_document(doc_id)
+
+    def queue_mark_as_read(self, doc_id: int, is_read: int = 1):
+        """Mark document as read/unread through the background writer."""
+        self.queue_write("""
+            UPDATE documents
             SET is_read = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (is_read, doc_id))
-        conn.commit()
-        conn.close()
+            WHERE id = ? AND is_read IS NOT ?
+        """, (is_read, doc_id, is_read), key=('read_state', doc_id),
+            invalidate=lambda: self._invalidate_document(doc_id))
 
     def get_unread_count(self, topic_id: int):
         """Get count of unread documents for a topic."""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM documents 
-            WHERE topic_id = ? AND is_read = 0
-        """, (topic_id,))
+        cursor.execute("SELECT unread_count FROM topics WHERE id = ?", (topic_id,))
         result = cursor.fetchone()
-        conn.close()
-        return result['count']
+        return result['unread_count'] if result else 0
 
-    def clear_documents_for_topic(self, topic_id: int):
-        """Clear all documents for a topic (used before re-downloading)."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM documents WHERE topic_id = ?", (topic_id,))
-        conn.commit()
-        conn.close()
+    def get_topic_stats(self) -> dict:
+        """Get {topic_id: row} with name, doc_count, unread_count, word_count and updated_at for every topic.
 
-    def update_topic_timestamp(self, topic_id: int):
-        """Update topic's last update timestamp."""
+        Counts come from the counters kept on the topics table and word
+        counts from the metadata index, so this never touches the documents
+        table.
+        """
+        def load():
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT t.id, t.name, t.doc_count, t.unread_count, t.updated_at,
+                       COALESCE(w.word_count, 0) AS word_count
+                FROM topics t
+                LEFT JOIN (
+                    SELECT topic_id, SUM(word_count) AS word_count FROM document_metadata
+                    GROUP BY topic_id
+                ) w ON w.topic_id = t.id
+                ORDER BY t.name
+            """)
+            return {row['id']: row for row in cursor.fetchall()}
+        return self.cache.get_or_load(('topic_stats',), load)
+
+    def get_document_fingerprints(self, topic_id: int) -> dict:
+        """Get {relative_path: (crc32, file_size)} for a topic's documents."""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("""
-            UPDATE topics 
-            SET updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
+            SELECT relative_path, crc32, file_size FROM documents
+            WHERE topic_id = ?
         """, (topic_id,))
-        conn.commit()
-        conn.close()
+        fingerprints = {row['relative_path']: (row['crc32'], row['file_size']) for row in cursor.fetchall()}
+        return fingerprints
+
+    def update_topic_timestamp(self, topic_id: int):
+        """Update topic's last update timestamp."""
+        with self.transaction() as cursor:
+            cursor.execute("""
+                UPDATE topics 
+                SET updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (topic_id,))
+        self._invalidate_topic(topic_id)
+
+    def set_topic_branch(self, topic_id: int, branch: str):
+        """Remember the branch a topic's archive was downloaded from."""
+        with self.transaction() as cursor:
+            cursor.execute("""
+                UPDATE topics
+                SET branch = ?
+                WHERE id = ?
+            """, (branch, topic_id))
+        self._invalidate_topic(topic_id)
+
+    def get_topic_validators(self, topic_id: int) -> Optional[dict]:
+        """Get the HTTP cache validators stored for a topic's archive."""
+        topic = self.get_topic(topic_id)
+        if not topic or not (topic['etag'] or topic['last_modified']):
+            return None
+        return {
+            'etag': topic['etag'],
+            'last_modified': topic['last_modified'],
+            'size': topic['archive_size']
+        }
+
+    def set_topic_validators(self, topic_id: int, validators: Optional[dict]):
+        """Store the HTTP cache validators of the last downloaded archive."""
+        validators = validators or {}
+        with self.transaction() as cursor:
+            cursor.execute("""
+                UPDATE topics
+                SET etag = ?, last_modified = ?, archive_size = ?
+                WHERE id = ?
+            """, (validators.get('etag'), validators.get('last_modified'), validators.get('size'), topic_id))
+        self._invalidate_topic(topic_id)
@@ -0,0 +1,132 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+class MetadataCache:
+    """In-process LRU cache for topic and document rows.
+
+    Entries are keyed by tuples such as ('topic', topic_id) and may carry
+    tags so a group of entries (e.g. every cached document of a topic) can
+    be invalidated at once. Memory use is estimated per entry and the least
+    recently used entries are evicted once max_bytes is exceeded.
+
+    Every invalidation bumps a generation counter. A value loaded while an
+    invalidation happened is returned but not stored, so a read racing a
+    write in another thread can never cache the old row.
+    """
+
+    # Rough per-object overhead added to value sizes, in bytes
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        """Initialize an empty cache with a memory cap."""
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, loader: Callable, tags: Optional[Callable] = None):
+        """Return the cached value for key, loading and caching it on a miss.
+
+        tags, if given, is called with the loaded value and returns the tags
+        to store the entry under. None values are never cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        if value is None:
+            return value
+
+        with self._lock:
+            if generation == self._generation and key not in self._entries:
+                self._store(key, value, tuple(tags(value)) if tags else ())
+        return value
+
+    def invalidate(self, *keys):
+        """Drop the given keys."""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable):
+        """Drop every entry stored with tag."""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Get hit/miss/eviction counters and current memory use."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def _store(self, key, value, tags: tuple):
+        """Insert an entry and evict least recently used ones over the cap."""
+        size = self._estimate_size(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size, tags)
+        self._bytes += size
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        """Remove an entry and its tag references, if present."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, size, tags = entry
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    @classmethod
+    def _estimate_size(cls, value) -> int:
+        """Estimate the memory held by a row, a list of rows or a dict of rows."""
+        if isinstance(value, dict):
+            return cls.ENTRY_OVERHEAD + sum(cls._estimate_size(row) for row in value.values())
+        if isinstance(value, list):
+            return cls.ENTRY_OVERHEAD + sum(cls._estimate_size(row) for row in value)
+        # A single row: its fields plus the row object itself
+        return cls.ENTRY_OVERHEAD + sum(sys.getsizeof(field) for field in value)
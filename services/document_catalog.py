@@ -0,0 +1,126 @@
+import sys
+from array import array
+from bisect import bisect_left
+from typing import NamedTuple, Optional
+
+
+class CatalogFolder:
+    """A folder in a topic's document tree."""
+
+    __slots__ = ('name', 'path', 'folders', 'documents')
+
+    def __init__(self, name: str, path: str):
+        """Initialize an empty folder; path is '' for the root, else ends with '/'."""
+        self.name = name
+        self.path = path
+        self.folders = {}
+        # Catalog positions of the documents directly in this folder
+        self.documents = array('I')
+
+    def sorted_folders(self) -> list:
+        """Subfolders in name order."""
+        return [self.folders[name] for name in sorted(self.folders)]
+
+
+class DocumentEntry(NamedTuple):
+    """A document as handed out by the catalog (built on access, not stored)."""
+
+    id: int
+    title: str
+    name: str
+    relative_path: str
+    is_read: bool
+
+
+def default_title(filename: str) -> str:
+    """Title derived from a document's file name when it has no better one."""
+    return filename.replace('.md', '').replace('_', ' ').title()
+
+
+class DocumentCatalog:
+    """Compact in-memory tree of a topic's documents, built once per topic load.
+
+    Documents are stored as parallel arrays indexed by catalog position
+    rather than one object per document: ids in an int64 array, file names
+    in a list, read flags in a bytearray. Folder names and paths are
+    interned and kept once per folder instead of in every relative path,
+    titles are only stored when they differ from default_title(name), and
+    ids are found by bisecting a sorted copy instead of through a dict.
+    """
+
+    def __init__(self, topic_id: int, rows):
+        """Build the tree from get_topic_documents rows."""
+        self.topic_id = topic_id
+        self.root = CatalogFolder('', '')
+        self._ids = array('q')
+        self._names = []
+        self._titles = []
+        self._folders = []
+        self._read = bytearray()
+
+        for row in rows:
+            parts = row['relative_path'].replace('\\', '/').split('/')
+            folder = self.root
+            for part in parts[:-1]:
+                child = folder.folders.get(part)
+                if child is None:
+                    part = sys.intern(part)
+                    child = CatalogFolder(part, sys.intern(folder.path + part + '/'))
+                    folder.folders[part] = child
+                folder = child
+
+            name = parts[-1]
+            title = row['title']
+            folder.documents.append(len(self._ids))
+            self._ids.append(row['id'])
+            self._names.append(name)
+            self._titles.append(None if title == default_title(name) else title)
+            self._folders.append(folder)
+            self._read.append(1 if row['is_read'] else 0)
+
+        order = sorted(range(len(self._ids)), key=self._ids.__getitem__)
+        self._sorted_ids = array('q', (self._ids[position] for position in order))
+        self._sorted_positions = array('I', order)
+
+    def __len__(self) -> int:
+        """Number of documents in the catalog."""
+        return len(self._ids)
+
+    def documents(self, folder: CatalogFolder) -> list:
+        """Entries for the documents directly in folder, in path order."""
+        return [self._entry(position) for position in folder.documents]
+
+    def get(self, doc_id: int) -> Optional[DocumentEntry]:
+        """Get a document entry by id."""
+        position = self._position(doc_id)
+        return None if position is None else self._entry(position)
+
+    def mark_read(self, doc_id: int, is_read: bool = True) -> bool:
+        """Set a document's read state; True if it changed."""
+        position = self._position(doc_id)
+        if position is None or self._read[position] == is_read:
+            return False
+        self._read[position] = 1 if is_read else 0
+        return True
+
+    def unread_count(self) -> int:
+        """Number of unread documents."""
+        return self._read.count(0)
+
+    def _position(self, doc_id: int) -> Optional[int]:
+        """Catalog position of a document id, or None."""
+        index = bisect_left(self._sorted_ids, doc_id)
+        if index < len(self._sorted_ids) and self._sorted_ids[index] == doc_id:
+            return self._sorted_positions[index]
+        return None
+
+    def _entry(self, position: int) -> DocumentEntry:
+        """Assemble the entry stored at a catalog position."""
+        name = self._names[position]
+        return DocumentEntry(
+            id=self._ids[position],
+            title=self._titles[position] or default_title(name),
+            name=name,
+            relative_path=self._folders[position].path + name,
+            is_read=bool(self._read[position])
+        )
@@ -1,128 +1,869 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import zipfile
+import tempfile
+import shutil
 import io
 import os
+import json
+import time
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union, BinaryIO, Callable
+
+
+# Progress callbacks receive (phase, done, total); phase is 'download' (bytes),
+# 'extract' (ZIP entries) or 'analyze' (documents parsed for metadata, see
+# sync_scheduler.extract_metadata). total is 0 when the size is not known.
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class ProgressThrottle:
+    """Rate-limits progress callbacks so listeners get a few updates per second."""
+
+    def __init__(self, callback: Optional[ProgressCallback], phase: str, total: int = 0, interval: float = 0.25):
+        """Initialize throttle for one phase of work."""
+        self.callback = callback
+        self.phase = phase
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self._last_emit = 0.0
+
+    def update(self, done: int):
+        """Record progress and emit it if the interval has elapsed."""
+        self.done = done
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if now - self._last_emit >= self.interval:
+            self._last_emit = now
+            self.callback(self.phase, done, self.total)
+
+    def advance(self, amount: int):
+        """Add amount to the running total and maybe emit."""
+        self.update(self.done + amount)
+
+    def finish(self):
+        """Always emit the final state of the phase."""
+        if self.callback is not None:
+            self.callback(self.phase, self.done, self.total or self.done)
 
 
 class Downloader:
     """Handles downloading documentation from GitHub."""
 
+    # Size of each chunk read from a streamed response
+    CHUNK_SIZE = 64 * 1024
+    # Archives larger than this are spilled from memory to a temp file on disk
+    SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+    # Base URLs, overridable so downloads can be pointed at a local stand-in server
+    GITHUB_BASE_URL = 'https://github.com/'
+    RAW_BASE_URL = 'https://raw.githubusercontent.com/'
+    # Branches tried when a topic has no known branch yet
+    CANDIDATE_BRANCHES = ['main', 'master', 'develop', 'dev']
+    REQUEST_TIMEOUT = 30
+
+    # Shared HTTP session settings (see configure_session)
+    POOL_SIZE = 16
+    MAX_RETRIES = 3
+    BACKOFF_FACTOR = 0.5
+    RETRY_STATUSES = (500, 502, 503, 504)
+
+    _session = None
+    _session_lock = threading.Lock()
+
+    @staticmethod
+    def get_session() -> requests.Session:
+        """Get the shared keep-alive session used for every downloader request."""
+        with Downloader._session_lock:
+            if Downloader._session is None:
+                Downloader._session = Downloader._create_session()
+            return Downloader._session
+
+    @staticmethod
+    def configure_session(pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                          backoff_factor: Optional[float] = None):
+        """Change pool and retry settings; the session is rebuilt on next use."""
+        if pool_size is not None:
+            Downloader.POOL_SIZE = pool_size
+        if max_retries is not None:
+            Downloader.MAX_RETRIES = max_retries
+        if backoff_factor is not None:
+            Downloader.BACKOFF_FACTOR = backoff_factor
+        with Downloader._session_lock:
+            if Downloader._session is not None:
+                Downloader._session.close()
+                Downloader._session = None
+
     @staticmethod
-    def download_repo_zip(github_url: str) -> bytes:
-        """Download repository as ZIP from GitHub."""
-        # Convert GitHub URL to raw download URL
-        # Support both https://github.com/user/repo and https://github.com/user/repo.git
-        repo_url = github_url.rstrip('.git')
-        if not repo_url.startswith('https://github.com/'):
+    def _create_session() -> requests.Session:
+        """Build a pooled session that retries 5xx and connection errors with exponential backoff."""
+        retry = Retry(
+            total=Downloader.MAX_RETRIES,
+            connect=Downloader.MAX_RETRIES,
+            read=Downloader.MAX_RETRIES,
+            status=Downloader.MAX_RETRIES,
+            backoff_factor=Downloader.BACKOFF_FACTOR,
+            status_forcelist=Downloader.RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=Downloader.POOL_SIZE,
+                              pool_maxsize=Downloader.POOL_SIZE,
+                              max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def normalize_repo_url(github_url: str) -> str:
+        """Strip trailing slash and .git suffix from a repository URL."""
+        repo_url = github_url.strip().rstrip('/')
+        if repo_url.endswith('.git'):
+            repo_url = repo_url[:-len('.git')]
+        if not repo_url.startswith(Downloader.GITHUB_BASE_URL):
             raise ValueError("Invalid GitHub URL")
+        return repo_url
 
-        # Try multiple branches
-        branches = ['main', 'master', 'develop', 'dev']
-        last_error = None
+    @staticmethod
+    def archive_url(repo_url: str, branch: str) -> str:
+        """Build the ZIP archive URL for a branch."""
+        return f"{repo_url}/archive/refs/heads/{branch}.zip"
 
-        for branch in branches:
+    @staticmethod
+    def download_repo_zip(github_url: str, stream: bool = False,
+                          progress_callback: Optional[ProgressCallback] = None,
+                          branch: Optional[str] = None) -> Union[bytes, BinaryIO]:
+        """Download repository as ZIP from GitHub.
+
+        With stream=True the archive is written chunk by chunk to a spooled
+        temporary file and the open file handle (rewound to the start) is
+        returned instead of the raw bytes. The caller is responsible for
+        closing it. progress_callback receives throttled 'download' events
+        (bytes received against Content-Length) in streaming mode.
+        """
+        result = Downloader.fetch_archive(github_url, branch, progress_callback)
+        if stream:
+            return result['archive']
+        with result['archive'] as archive:
+            return archive.read()
+
+    @staticmethod
+    def fetch_archive(github_url: str, branch: Optional[str] = None,
+                      progress_callback: Optional[ProgressCallback] = None,
+                      validators: Optional[dict] = None,
+                      staging_dir: Optional[str] = None) -> dict:
+        """Download the repository archive and report which branch served it.
+
+        A known branch is tried first on its own. Only if it is gone (404),
+        or no branch is known, are the candidate branches probed in parallel;
+        the highest-priority candidate that answers 200 wins. Any other
+        failure of the known branch is raised rather than switching branches.
+
+        validators ({'etag', 'last_modified', 'size'}) from the previous sync
+        of the known branch turn the first request into a conditional one.
+        Returns {'archive', 'branch', 'not_modified', 'validators'}; when the
+        server reports the archive unchanged, 'archive' is None and
+        'not_modified' is True.
+
+        With staging_dir the archive is written to a partial file there
+        instead of a temp file. If a previous attempt left a partial file,
+        the download resumes from where it stopped using a Range request;
+        a staged archive that is already complete (a later step failed) is
+        reused without a request. Call clear_staging once the archive has
+        been processed.
+        """
+        repo_url = Downloader.normalize_repo_url(github_url)
+
+        staged = Downloader._read_staging_meta(staging_dir)
+        if staged and not branch:
+            branch = staged.get('branch')
+
+        candidates = [b for b in Downloader.CANDIDATE_BRANCHES if b != branch]
+
+        if branch:
+            resume = staged if staged and staged.get('branch') == branch else None
+            if resume:
+                result = Downloader._staged_result(staging_dir, resume)
+                if result is not None:
+                    return result
             try:
-                download_url = f"{repo_url}/archive/refs/heads/{branch}.zip"
-                response = requests.get(download_url, timeout=30)
-                if response.status_code == 200:
-                    return response.content
+                response = Downloader._resume_request(
+                    lambda headers: Downloader._get_archive_response(repo_url, branch, headers),
+                    Downloader._conditional_headers(validators), staging_dir, resume)
             except Exception as e:
-                last_error = e
-                continue
+                # A transient failure must not switch the topic to another branch
+                raise Exception(f"Could not download branch '{branch}': {e}")
+            if response is not None:
+                if Downloader._is_unchanged(response, validators):
+                    response.close()
+                    return {'archive': None, 'branch': branch,
+                            'not_modified': True, 'validators': validators}
+                return Downloader._archive_result(response, branch, progress_callback, staging_dir)
 
-        # If all branches failed, raise error
-        if last_error:
-            raise Exception(f"Could not download repository from any branch: {last_error}")
+        try:
+            resolved, response = Downloader._probe_branches(repo_url, candidates)
+        except Exception as e:
+            raise Exception(f"Could not download repository from any branch: {e}")
+
+        return Downloader._archive_result(response, resolved, progress_callback, staging_dir)
+
+    @staticmethod
+    def fetch_url_archive(url: str, progress_callback: Optional[ProgressCallback] = None,
+                          validators: Optional[dict] = None,
+                          staging_dir: Optional[str] = None) -> dict:
+        """Download an archive from an arbitrary HTTP(S) URL.
+
+        Uses the same conditional-request and resume handling as
+        fetch_archive and returns the same result dict, with 'branch' None.
+        """
+        staged = Downloader._read_staging_meta(staging_dir)
+        if staged:
+            result = Downloader._staged_result(staging_dir, staged)
+            if result is not None:
+                return result
+
+        response = Downloader._resume_request(
+            lambda headers: Downloader.get_session().get(url, headers=headers,
+                                                         timeout=Downloader.REQUEST_TIMEOUT, stream=True),
+            Downloader._conditional_headers(validators), staging_dir, staged)
+        if response.status_code not in (200, 206, 304):
+            response.close()
+            raise Exception(f"Could not download archive: HTTP {response.status_code}")
+
+        if Downloader._is_unchanged(response, validators):
+            response.close()
+            return {'archive': None, 'branch': None, 'not_modified': True, 'validators': validators}
+        return Downloader._archive_result(response, None, progress_callback, staging_dir)
+
+    @staticmethod
+    def _conditional_headers(validators: Optional[dict]) -> dict:
+        """Build If-None-Match / If-Modified-Since headers from stored validators."""
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    @staticmethod
+    def _is_unchanged(response, validators: Optional[dict]) -> bool:
+        """Check whether a response says the archive matches the stored validators."""
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200 or not validators or not validators.get('etag'):
+            return False
+        # Some proxies ignore conditional headers; fall back to comparing the
+        # ETag and length of a full response before reading its body
+        etag = response.headers.get('ETag')
+        size = response.headers.get('Content-Length')
+        return (etag == validators['etag'] and size is not None
+                and validators.get('size') is not None and int(size) == validators['size'])
+
+    @staticmethod
+    def _archive_result(response, branch: str, progress_callback: Optional[ProgressCallback],
+                        staging_dir: Optional[str] = None) -> dict:
+        """Store a 200/206 response body and collect its validators for the next sync."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if staging_dir:
+            archive = Downloader._stage_response(response, branch, staging_dir, progress_callback)
         else:
-            raise Exception("Repository not found or no accessible branches")
+            archive = Downloader._spool_response(response, progress_callback)
+        archive.seek(0, os.SEEK_END)
+        size = archive.tell()
+        archive.seek(0)
+        return {
+            'archive': archive,
+            'branch': branch,
+            'not_modified': False,
+            'validators': {'etag': etag, 'last_modified': last_modified, 'size': size}
+        }
 
     @staticmethod
-    def extract_markdown_files(zip_bytes: bytes, target_dir: str, subfolder: Optional[str] = None) -> list:
-        """Extract markdown files from ZIP."""
-        extracted_files = []
-        Path(target_dir).mkdir(parents=True, exist_ok=True)
+    def staging_dir_for(local_path: str) -> str:
+        """Staging directory for partial downloads, next to a topic's local path."""
+        return os.path.normpath(local_path) + '.staging'
 
-        with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_ref:
-            for file_info in zip_ref.filelist:
-                # Skip directories and non-markdown files
-                if file_info.filename.endswith('/') or not file_info.filename.endswith('.md'):
-                    continue
+    @staticmethod
+    def clear_staging(staging_dir: Optional[str]):
+        """Remove a staging directory and any partial download in it."""
+        if staging_dir and os.path.isdir(staging_dir):
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    @staticmethod
+    def _staging_paths(staging_dir: str) -> tuple:
+        """Paths of the partial archive and its metadata file."""
+        return (os.path.join(staging_dir, 'archive.zip.part'),
+                os.path.join(staging_dir, 'archive.json'))
+
+    @staticmethod
+    def _read_staging_meta(staging_dir: Optional[str]) -> Optional[dict]:
+        """Load metadata of a partial download, if one is usable."""
+        if not staging_dir:
+            return None
+        part_path, meta_path = Downloader._staging_paths(staging_dir)
+        if not (os.path.exists(part_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _range_headers(staging_dir: str, staged: dict) -> dict:
+        """Build Range / If-Range headers to resume a partial download."""
+        part_path, _ = Downloader._staging_paths(staging_dir)
+        offset = os.path.getsize(part_path)
+        # If-Range needs a strong validator; weak ETags cannot be used
+        validator = staged.get('etag')
+        if not validator or validator.startswith('W/'):
+            validator = staged.get('last_modified')
+        if not offset or not validator:
+            return {}
+        return {'Range': f"bytes={offset}-", 'If-Range': validator}
+
+    @staticmethod
+    def _staged_result(staging_dir: str, staged: dict) -> Optional[dict]:
+        """Result for a staged archive that was downloaded completely, else None."""
+        part_path, _ = Downloader._staging_paths(staging_dir)
+        total = staged.get('total')
+        if not total or os.path.getsize(part_path) != total:
+            return None
+        return {
+            'archive': open(part_path, 'rb'),
+            'branch': staged.get('branch'),
+            'not_modified': False,
+            'validators': {'etag': staged.get('etag'), 'last_modified': staged.get('last_modified'),
+                           'size': total}
+        }
+
+    @staticmethod
+    def _resume_request(request: Callable, headers: dict, staging_dir: Optional[str],
+                        staged: Optional[dict]):
+        """Call request(headers), resuming the staged download if there is one.
+
+        If the server rejects the range (416), the partial file is discarded
+        and the request is sent once more without it.
+        """
+        if not staged:
+            return request(headers)
+        response = request(dict(headers, **Downloader._range_headers(staging_dir, staged)))
+        if response is None or response.status_code != 416:
+            return response
+        response.close()
+        Downloader.clear_staging(staging_dir)
+        response = request(headers)
+        if response is not None and response.status_code == 416:
+            response.close()
+            raise Exception("Server rejected the download range")
+        return response
+
+    @staticmethod
+    def _stage_response(response, branch: str, staging_dir: str,
+                        progress_callback: Optional[ProgressCallback] = None) -> BinaryIO:
+        """Write a response body to the staging directory, appending on 206.
 
-                # Skip hidden files and common non-doc files
-                parts = file_info.filename.split('/')
-                if any(part.startswith('.') for part in parts):
+        The partial file is kept if the transfer fails so the next attempt can
+        resume. Returns the completed archive opened for reading.
+        """
+        os.makedirs(staging_dir, exist_ok=True)
+        part_path, meta_path = Downloader._staging_paths(staging_dir)
+
+        try:
+            offset = 0
+            total = int(response.headers.get('Content-Length') or 0)
+            if response.status_code == 206:
+                # Content-Range: bytes <start>-<end>/<total>
+                content_range = response.headers.get('Content-Range', '')
+                start, _, length = content_range.replace('bytes ', '').partition('/')
+                offset = int(start.split('-')[0])
+                total = int(length) if length.isdigit() else 0
+                if offset != os.path.getsize(part_path):
+                    Downloader.clear_staging(staging_dir)
+                    raise Exception("Server resumed at an unexpected offset")
+
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'branch': branch,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'total': total
+                }, f)
+
+            progress = ProgressThrottle(progress_callback, 'download', total)
+            progress.update(offset)
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=Downloader.CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        progress.advance(len(chunk))
+            progress.finish()
+        finally:
+            response.close()
+
+        size = os.path.getsize(part_path)
+        if total and size != total:
+            if size > total:
+                Downloader.clear_staging(staging_dir)
+            raise Exception(f"Incomplete download: received {size} of {total} bytes")
+
+        return open(part_path, 'rb')
+
+    @staticmethod
+    def _get_archive_response(repo_url: str, branch: str, headers: Optional[dict] = None):
+        """Request a branch archive; return the open response on 200/206/304/416, None on 404.
+
+        Any other status raises, so callers can tell a missing branch from
+        a failed request. 416 is left to _resume_request.
+        """
+        response = Downloader.get_session().get(Downloader.archive_url(repo_url, branch), headers=headers,
+                                                timeout=Downloader.REQUEST_TIMEOUT, stream=True)
+        if response.status_code in (200, 206, 304, 416):
+            return response
+        response.close()
+        if response.status_code == 404:
+            return None
+        raise Exception(f"HTTP {response.status_code} for branch '{branch}'")
+
+    @staticmethod
+    def _probe_branches(repo_url: str, branches: list) -> tuple:
+        """Probe branches concurrently; return (branch, response) for the best one that answers 200.
+
+        branches is in priority order. All probes start at once, but a branch
+        only wins once every branch before it has failed, so a fast 'develop'
+        never beats a slower 'main'. Responses are opened in streaming mode
+        so only headers are read; responses of losing probes are closed.
+        """
+        def close_response(future):
+            if not future.cancelled() and future.exception() is None and future.result() is not None:
+                future.result().close()
+
+        last_error = None
+        executor = ThreadPoolExecutor(max_workers=max(len(branches), 1))
+        futures = [executor.submit(Downloader._get_archive_response, repo_url, b) for b in branches]
+        try:
+            for index, (branch, future) in enumerate(zip(branches, futures)):
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
                     continue
+                if response is not None:
+                    for other in futures[index + 1:]:
+                        other.add_done_callback(close_response)
+                    return branch, response
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-                # If subfolder specified, only extract from that subfolder
-                if subfolder:
-                    if subfolder not in file_info.filename:
-                        continue
+        if last_error:
+            raise last_error
+        raise Exception("Repository not found or no accessible branches")
 
-                # Extract file
-                extracted_data = zip_ref.read(file_info.filename)
-                
-                # Build local path preserving directory structure
-                rel_path = file_info.filename
-                if subfolder:
-                    # Find subfolder in path and start from there
-                    idx = rel_path.find(subfolder)
-                    if idx != -1:
-                        rel_path = rel_path[idx:]
-                else:
-                    # Remove repo root folder name
-                    rel_path = '/'.join(rel_path.split('/')[1:])
+    @staticmethod
+    def _spool_response(response, progress_callback: Optional[ProgressCallback] = None) -> BinaryIO:
+        """Copy a streamed response body into a spooled temp file."""
+        spool = tempfile.SpooledTemporaryFile(max_size=Downloader.SPOOL_MAX_SIZE)
+        total = int(response.headers.get('Content-Length') or 0)
+        progress = ProgressThrottle(progress_callback, 'download', total)
+        try:
+            for chunk in response.iter_content(chunk_size=Downloader.CHUNK_SIZE):
+                if chunk:
+                    spool.write(chunk)
+                    progress.advance(len(chunk))
+            progress.finish()
+            spool.seek(0)
+            return spool
+        except Exception:
+            spool.close()
+            raise
+        finally:
+            response.close()
 
-                local_path = os.path.join(target_dir, rel_path.replace('/', os.sep))
-                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    @staticmethod
+    def _open_zip(zip_source: Union[bytes, BinaryIO]) -> zipfile.ZipFile:
+        """Open a ZipFile over archive bytes or a seekable file handle."""
+        if isinstance(zip_source, (bytes, bytearray)):
+            zip_source = io.BytesIO(zip_source)
+        return zipfile.ZipFile(zip_source)
 
-                with open(local_path, 'wb') as f:
-                    f.write(extracted_data)
+    @staticmethod
+    def _archive_root(zip_ref: zipfile.ZipFile) -> str:
+        """Return the single top-level folder shared by all entries (e.g. 'repo-main/'), or ''."""
+        roots = {info.filename.split('/', 1)[0] for info in zip_ref.filelist}
+        if len(roots) == 1 and all('/' in info.filename for info in zip_ref.filelist):
+            return roots.pop() + '/'
+        return ''
+
+    @staticmethod
+    def _doc_relative_path(name: str, subfolder: Optional[str], root: str = '') -> Optional[str]:
+        """Map an archive/directory entry name to a document relative path, or None to skip it."""
+        # Skip directories and non-markdown files
+        if name.endswith('/') or not name.endswith('.md'):
+            return None
+
+        # Skip hidden files and common non-doc files
+        parts = name.split('/')
+        if any(part.startswith('.') for part in parts):
+            return None
+
+        # If subfolder specified, only extract from that subfolder
+        if subfolder:
+            if subfolder not in name:
+                return None
+
+        # Build local path preserving directory structure
+        rel_path = name
+        if subfolder:
+            # Find subfolder in path and start from there
+            idx = rel_path.find(subfolder)
+            if idx != -1:
+                rel_path = rel_path[idx:]
+        elif root and rel_path.startswith(root):
+            # Remove repo root folder name
+            rel_path = rel_path[len(root):]
+
+        return rel_path
+
+    @staticmethod
+    def _iter_markdown_entries(zip_ref: zipfile.ZipFile, subfolder: Optional[str],
+                               progress: ProgressThrottle):
+        """Yield (file_info, relative_path) for each documentation entry in the archive."""
+        root = Downloader._archive_root(zip_ref)
+        for index, file_info in enumerate(zip_ref.filelist, 1):
+            progress.update(index)
+            rel_path = Downloader._doc_relative_path(file_info.filename, subfolder, root)
+            if rel_path is not None:
+                yield file_info, rel_path
+
+    @staticmethod
+    def _change_bucket(known: dict, rel_path: str, crc32: int, size: int, local_path: str) -> Optional[str]:
+        """Classify a document against its stored fingerprint: 'added', 'modified' or None if unchanged."""
+        previous = known.get(rel_path)
+        if previous is None:
+            return 'added'
+        if tuple(previous) != (crc32, size) or not os.path.exists(local_path):
+            return 'modified'
+        return None
+
+    @staticmethod
+    def _write_entry(zip_ref: zipfile.ZipFile, file_info: zipfile.ZipInfo, local_path: str):
+        """Copy a ZIP entry to disk in chunks rather than reading it fully into memory."""
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with zip_ref.open(file_info) as src, open(local_path, 'wb') as f:
+            shutil.copyfileobj(src, f, Downloader.CHUNK_SIZE)
+
+    @staticmethod
+    def extract_markdown_files(zip_source: Union[bytes, BinaryIO], target_dir: str, subfolder: Optional[str] = None,
+                               progress_callback: Optional[ProgressCallback] = None,
+                               github_url: Optional[str] = None) -> list:
+        """Extract markdown files from ZIP.
+
+        zip_source may be the archive bytes or a seekable binary file handle
+        (as returned by download_repo_zip with stream=True). progress_callback
+        receives throttled 'extract' events (entries processed against the
+        number of entries in the central directory). When github_url is given
+        and the archive holds no markdown, the README fallback is tried.
+        """
+        extracted_files = []
+        Path(target_dir).mkdir(parents=True, exist_ok=True)
+
+        with Downloader._open_zip(zip_source) as zip_ref:
+            progress = ProgressThrottle(progress_callback, 'extract', len(zip_ref.filelist))
+            for file_info, rel_path in Downloader._iter_markdown_entries(zip_ref, subfolder, progress):
+                local_path = os.path.join(target_dir, rel_path.replace('/', os.sep))
+                Downloader._write_entry(zip_ref, file_info, local_path)
 
                 extracted_files.append({
                     'local_path': local_path,
-                    'relative_path': rel_path
+                    'relative_path': rel_path,
+                    'crc32': file_info.CRC,
+                    'size': file_info.file_size
                 })
 
-        if not extracted_files:
+            progress.finish()
+
+        if not extracted_files and github_url:
             # try fallback to fetch README directly
-            fallback = Downloader.fetch_readme_fallback(repo_url := None or github_url, target_dir, subfolder)
+            fallback = Downloader.fetch_readme_fallback(github_url, target_dir, subfolder)
             if fallback:
                 return fallback
 
         return extracted_files
 
     @staticmethod
-    def fetch_readme_fallback(github_url: str, target_dir: str, subfolder: Optional[str] = None) -> list:
-        """If ZIP extraction yields no markdowns, try to fetch README.md directly from raw.githubusercontent.com for common locations."""
+    def extract_markdown_changes(zip_source: Union[bytes, BinaryIO], target_dir: str, subfolder: Optional[str] = None,
+                                 known: Optional[dict] = None,
+                                 progress_callback: Optional[ProgressCallback] = None,
+                                 staging_dir: Optional[str] = None) -> dict:
+        """Incrementally extract markdown files from ZIP.
+
+        known maps relative_path to the (crc32, size) recorded at the previous
+        sync. Entries whose CRC32 and size in the central directory match, and
+        whose file is still on disk, are left alone; only new or changed files
+        are written, and files that disappeared from the archive are deleted.
+
+        With staging_dir, new and changed files are written there instead and
+        nothing under target_dir is touched until commit_staged_changes is
+        called, so the current documents stay readable during the sync.
+
+        Returns a changeset {'added', 'modified', 'unchanged', 'removed'}; the
+        first three are lists of file dicts as returned by
+        extract_markdown_files, 'removed' is a list of relative paths.
+        """
+        known = known or {}
+        changes = {'added': [], 'modified': [], 'unchanged': [], 'removed': []}
+        seen = set()
+        Path(target_dir).mkdir(parents=True, exist_ok=True)
+
+        with Downloader._open_zip(zip_source) as zip_ref:
+            progress = ProgressThrottle(progress_callback, 'extract', len(zip_ref.filelist))
+            for file_info, rel_path in Downloader._iter_markdown_entries(zip_ref, subfolder, progress):
+                local_path = os.path.join(target_dir, rel_path.replace('/', os.sep))
+                seen.add(rel_path)
+                file_entry = {
+                    'local_path': local_path,
+                    'relative_path': rel_path,
+                    'crc32': file_info.CRC,
+                    'size': file_info.file_size
+                }
+
+                bucket = Downloader._change_bucket(known, rel_path, file_info.CRC, file_info.file_size, local_path)
+                if bucket is None:
+                    changes['unchanged'].append(file_entry)
+                    continue
+
+                write_path = Downloader._staged_write_path(file_entry, staging_dir)
+                Downloader._write_entry(zip_ref, file_info, write_path)
+                changes[bucket].append(file_entry)
+
+            progress.finish()
+
+        Downloader._remove_vanished(known, seen, target_dir, changes, defer=bool(staging_dir))
+        return changes
+
+    @staticmethod
+    def extract_directory_changes(source_dir: str, target_dir: str, subfolder: Optional[str] = None,
+                                  known: Optional[dict] = None,
+                                  progress_callback: Optional[ProgressCallback] = None,
+                                  staging_dir: Optional[str] = None) -> dict:
+        """Incrementally copy markdown files from a local checkout directory.
+
+        Works like extract_markdown_changes, with each file's CRC32 computed
+        from its contents, and returns the same changeset.
+        """
+        known = known or {}
+        changes = {'added': [], 'modified': [], 'unchanged': [], 'removed': []}
+        seen = set()
+        Path(target_dir).mkdir(parents=True, exist_ok=True)
+
+        names = []
+        for root, dirs, files in os.walk(source_dir):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for file in files:
+                names.append(os.path.relpath(os.path.join(root, file), source_dir).replace(os.sep, '/'))
+
+        progress = ProgressThrottle(progress_callback, 'extract', len(names))
+        for index, name in enumerate(sorted(names), 1):
+            progress.update(index)
+            rel_path = Downloader._doc_relative_path(name, subfolder)
+            if rel_path is None:
+                continue
+
+            source_path = os.path.join(source_dir, name.replace('/', os.sep))
+            with open(source_path, 'rb') as f:
+                content = f.read()
+            local_path = os.path.join(target_dir, rel_path.replace('/', os.sep))
+            seen.add(rel_path)
+            file_entry = {
+                'local_path': local_path,
+                'relative_path': rel_path,
+                'crc32': zlib.crc32(content),
+                'size': len(content)
+            }
+
+            bucket = Downloader._change_bucket(known, rel_path, file_entry['crc32'], file_entry['size'], local_path)
+            if bucket is None:
+                changes['unchanged'].append(file_entry)
+                continue
+
+            write_path = Downloader._staged_write_path(file_entry, staging_dir)
+            os.makedirs(os.path.dirname(write_path), exist_ok=True)
+            with open(write_path, 'wb') as f:
+                f.write(content)
+            changes[bucket].append(file_entry)
+
+        progress.finish()
+
+        Downloader._remove_vanished(known, seen, target_dir, changes, defer=bool(staging_dir))
+        return changes
+
+    @staticmethod
+    def _staged_write_path(file_entry: dict, staging_dir: Optional[str]) -> str:
+        """Where to write a changed file; records 'staged_path' when staging."""
+        if not staging_dir:
+            return file_entry['local_path']
+        staged_path = os.path.join(staging_dir, 'files', file_entry['relative_path'].replace('/', os.sep))
+        file_entry['staged_path'] = staged_path
+        return staged_path
+
+    @staticmethod
+    def _remove_vanished(known: dict, seen: set, target_dir: str, changes: dict, defer: bool = False):
+        """Delete files of previously known documents that are no longer in the source.
+
+        With defer=True the paths are only recorded and the files are deleted
+        by commit_staged_changes.
+        """
+        for rel_path in sorted(set(known) - seen):
+            if not defer:
+                local_path = os.path.join(target_dir, rel_path.replace('/', os.sep))
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+            changes['removed'].append(rel_path)
+
+    @staticmethod
+    def commit_staged_changes(changes: dict, target_dir: str):
+        """Move staged new/changed files into place and delete removed ones."""
+        for file_info in changes['added'] + changes['modified']:
+            staged_path = file_info.pop('staged_path', None)
+            if staged_path:
+                os.makedirs(os.path.dirname(file_info['local_path']), exist_ok=True)
+                os.replace(staged_path, file_info['local_path'])
+
+        for rel_path in changes['removed']:
+            local_path = os.path.join(target_dir, rel_path.replace('/', os.sep))
+            if os.path.exists(local_path):
+                os.remove(local_path)
+
+    # Overall deadline for the README fallback race, and how long a failed
+    # candidate URL is skipped before it is tried again
+    README_DEADLINE = 20
+    README_NEGATIVE_TTL = 300
+
+    _readme_failures = {}
+    _readme_failures_lock = threading.Lock()
+
+    @staticmethod
+    def fetch_readme_fallback(github_url: str, target_dir: str, subfolder: Optional[str] = None,
+                              branches: Optional[list] = None) -> list:
+        """If ZIP extraction yields no markdowns, try to fetch README.md directly from raw.githubusercontent.com for common locations.
+
+        All candidate URLs are requested concurrently; the first 200 response
+        wins and the remaining requests are cancelled. The whole race is
+        bounded by README_DEADLINE, and candidates that failed recently are
+        skipped.
+        """
         results = []
-        repo = github_url.rstrip('.git').replace('https://github.com/', '')
+        try:
+            repo = Downloader.normalize_repo_url(github_url).replace(Downloader.GITHUB_BASE_URL, '')
+        except ValueError:
+            return results
         if '/' not in repo:
             return results
 
         owner, name = repo.split('/')[:2]
-        branches = ['main', 'master', 'develop', 'dev']
+        branches = branches or Downloader.CANDIDATE_BRANCHES
         candidate_paths = ['README.md']
         if subfolder:
             candidate_paths.insert(0, f"{subfolder.strip('/')}/README.md")
         candidate_paths.append('docs/README.md')
 
-        for branch in branches:
-            for path in candidate_paths:
-                raw_url = f"https://raw.githubusercontent.com/{owner}/{name}/{branch}/{path}"
-                try:
-                    r = requests.get(raw_url, timeout=15)
-                    if r.status_code == 200 and r.content:
-                        # write file
-                        local_rel = os.path.join(path.replace('/', os.sep))
-                        local_path = os.path.join(target_dir, os.path.basename(path))
-                        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                        with open(local_path, 'wb') as f:
-                            f.write(r.content)
-                        results.append({'local_path': local_path, 'relative_path': os.path.basename(path)})
-                        return results
-                except Exception:
-                    continue
+        candidates = [
+            (path, f"{Downloader.RAW_BASE_URL}{owner}/{name}/{branch}/{path}")
+            for branch in branches
+            for path in candidate_paths
+            if not Downloader._readme_recently_failed(f"{Downloader.RAW_BASE_URL}{owner}/{name}/{branch}/{path}")
+        ]
+        if not candidates:
+            return results
 
+        winner = Downloader._race_readme_candidates(candidates)
+        if winner is None:
+            return results
+
+        path, content = winner
+        local_path = os.path.join(target_dir, os.path.basename(path))
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, 'wb') as f:
+            f.write(content)
+        results.append({
+            'local_path': local_path,
+            'relative_path': os.path.basename(path),
+            'crc32': zlib.crc32(content),
+            'size': len(content)
+        })
         return results
+
+    @staticmethod
+    def _readme_recently_failed(url: str) -> bool:
+        """Check the negative cache for a README candidate URL."""
+        with Downloader._readme_failures_lock:
+            expires = Downloader._readme_failures.get(url)
+            if expires is None:
+                return False
+            if expires <= time.monotonic():
+                del Downloader._readme_failures[url]
+                return False
+            return True
+
+    @staticmethod
+    def _remember_readme_failure(url: str):
+        """Put a README candidate URL in the negative cache."""
+        with Downloader._readme_failures_lock:
+            Downloader._readme_failures[url] = time.monotonic() + Downloader.README_NEGATIVE_TTL
+
+    @staticmethod
+    def _race_readme_candidates(candidates: list) -> Optional[tuple]:
+        """Fetch candidate (path, url) pairs concurrently; return (path, content) of the first hit."""
+        won = threading.Event()
+        deadline = time.monotonic() + Downloader.README_DEADLINE
+
+        def fetch(path, url):
+            if won.is_set():
+                return None
+            timeout = max(min(15, deadline - time.monotonic()), 0.1)
+            try:
+                r = Downloader.get_session().get(url, timeout=timeout, stream=True)
+            except Exception:
+                Downloader._remember_readme_failure(url)
+                return None
+            try:
+                if r.status_code != 200 or won.is_set():
+                    if r.status_code != 200:
+                        Downloader._remember_readme_failure(url)
+                    return None
+                content = r.content
+                if not content:
+                    Downloader._remember_readme_failure(url)
+                    return None
+                return path, content
+            finally:
+                r.close()
+
+        executor = ThreadPoolExecutor(max_workers=len(candidates))
+        try:
+            futures = [executor.submit(fetch, path, url) for path, url in candidates]
+            try:
+                for future in as_completed(futures, timeout=Downloader.README_DEADLINE):
+                    try:
+                        result = future.result()
+                    except Exception:
+                        continue
+                    if result:
+                        won.set()
+                        return result
+            except FuturesTimeoutError:
+                pass
+        finally:
+            won.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return None
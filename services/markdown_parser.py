@@ -4,68 +4,170 @@ from pygments import highlight
 from pygments.lexers import get_lexer_by_name, guess_lexer
 from pygments.formatters import TerminalFormatter
 import re
+import threading
+from typing import Optional
+from services.parse_cache import ParseCache
+from services import markdown_tokenizer
+
+
+class ParsedDocument:
+    """Parse results for one document, each field computed on first access.
+
+    Fields are memoized on the instance. When the parser has a cache,
+    fields are first looked up in the parse cache entry for the document's
+    content, and save() stores the ones computed here back into it in one
+    write, so a later document with the same content (or a restart)
+    reuses them. Title,
+    headings and code blocks are derived from the block list, so the
+    content is tokenized once for all of them and never converted to
+    HTML unless html is read.
+    """
+
+    FIELDS = ('blocks', 'title', 'headings', 'html', 'text', 'code_blocks', 'word_count', 'search_fields')
+
+    def __init__(self, parser: 'MarkdownParser', content: str):
+        """Initialize for a document's raw markdown; nothing is parsed yet."""
+        self.raw = content
+        self._parser = parser
+        self._fields = {}
+        self._key = None
+        self._entry = None
+        self._unsaved = False
+        if parser.cache is not None:
+            self._key = ParseCache.key_for(content, parser.CACHE_VERSION)
+
+    @property
+    def blocks(self) -> list:
+        """Block list from markdown_tokenizer.tokenize."""
+        return self.get('blocks')
+
+    @property
+    def title(self) -> str:
+        """First H1, or "Untitled"."""
+        return self.get('title')
+
+    @property
+    def headings(self) -> list:
+        """Heading outline: [{'level', 'title'}]."""
+        return self.get('headings')
+
+    @property
+    def html(self) -> str:
+        """Rendered HTML (the expensive field)."""
+        return self.get('html')
+
+    @property
+    def text(self) -> str:
+        """Plain text without code blocks or markdown syntax."""
+        return self.get('text')
+
+    @property
+    def code_blocks(self) -> list:
+        """Fenced code blocks: [{'language', 'code'}]."""
+        return self.get('code_blocks')
+
+    @property
+    def word_count(self) -> int:
+        """Number of words outside code blocks."""
+        return self.get('word_count')
+
+    def get(self, field: str):
+        """Get a field, computing and caching it on first access."""
+        if field in self._fields:
+            return self._fields[field]
+        if field not in self.FIELDS:
+            raise KeyError(field)
+
+        cache = self._parser.cache
+        if cache is not None and self._entry is None:
+            self._entry = cache.get(self._key) or {}
+        if self._entry and field in self._entry:
+            value = self._entry[field]
+        else:
+            value = self._parser.compute_field(field, self)
+            if cache is not None:
+                self._entry = dict(self._entry, **{field: value})
+                self._unsaved = True
+
+        self._fields[field] = value
+        return value
+
+    def save(self):
+        """Store fields computed since the last save in the parse cache, in one write."""
+        if self._unsaved:
+            self._parser.cache.put(self._key, self._entry)
+            self._unsaved = False
+
+    def as_dict(self, fields: tuple = ('title', 'headings', 'html')) -> dict:
+        """Selected fields plus 'raw' as a dict."""
+        result = {field: self.get(field) for field in fields}
+        result['raw'] = self.raw
+        self.save()
+        return result
 
 
 class MarkdownParser:
-    """Parses and renders markdown content."""
+    """Parses and renders markdown content.
 
-    def __init__(self):
-        """Initialize markdown parser."""
+    The HTML conversion reuses one markdown.Markdown instance, reset before
+    every document and serialized by a lock, so a parser may be shared
+    between threads; use ParserPool to parse on several threads at once.
+    """
+
+    # Part of parse cache keys; bump when a field's output changes
+    CACHE_VERSION = "5"
+
+    def __init__(self, cache: Optional[ParseCache] = None):
+        """Initialize markdown parser, optionally backed by a parse cache."""
         self.md = markdown.Markdown(extensions=[
             'extra',
             'codehilite',
             'toc'
         ])
+        self.cache = cache
+        self._md_lock = threading.Lock()
 
-    def parse(self, content: str) -> dict:
-        """Parse markdown content into structured format."""
-        # Extract title (first H1)
-        title_match = re.search(r'^#\s+(.+?)$', content, re.MULTILINE)
-        title = title_match.group(1) if title_match else "Untitled"
-
-        # Extract headings structure
-        headings = self._extract_headings(content)
-
-        # Parse markdown
-        html = self.md.convert(content)
+    def document(self, content: str) -> ParsedDocument:
+        """Wrap content for lazy, field-by-field parsing."""
+        return ParsedDocument(self, content)
 
-        return {
-            'title': title,
-            'headings': headings,
-            'html': html,
-            'raw': content
-        }
+    def parse(self, content: str) -> dict:
+        """Parse markdown content into structured format (title, headings, html, raw).
+
+        Always converts to HTML; use document() when only some fields are needed.
+        """
+        return self.document(content).as_dict()
+
+    def compute_field(self, field: str, document: ParsedDocument):
+        """Compute one ParsedDocument field, without caching it."""
+        if field == 'blocks':
+            return markdown_tokenizer.tokenize(document.raw)
+        if field == 'title':
+            return markdown_tokenizer.title(document.blocks) or "Untitled"
+        if field == 'headings':
+            return markdown_tokenizer.headings(document.blocks)
+        if field == 'html':
+            with self._md_lock:
+                # Clear state (e.g. toc ids) left by the previous conversion
+                self.md.reset()
+                return self.md.convert(document.raw)
+        if field == 'text':
+            return self.extract_text(document.raw)
+        if field == 'code_blocks':
+            return markdown_tokenizer.code_blocks(document.blocks)
+        if field == 'word_count':
+            return markdown_tokenizer.word_count(document.blocks)
+        if field == 'search_fields':
+            return self._search_fields(document.blocks, document.raw)
+        raise KeyError(field)
 
     def _extract_headings(self, content: str) -> list:
         """Extract heading structure from markdown."""
-        headings = []
-        lines = content.split('\n')
-
-        for line in lines:
-            if line.startswith('#'):
-                level = len(line) - len(line.lstrip('#'))
-                title = line.lstrip('#').strip()
-                headings.append({
-                    'level': level,
-                    'title': title
-                })
-
-        return headings
+        return markdown_tokenizer.headings(markdown_tokenizer.tokenize(content))
 
     def extract_code_blocks(self, content: str) -> list:
         """Extract code blocks from markdown."""
-        blocks = []
-        pattern = r'```(\w+)?\n(.*?)\n```'
-
-        for match in re.finditer(pattern, content, re.DOTALL):
-            language = match.group(1) or 'text'
-            code = match.group(2)
-            blocks.append({
-                'language': language,
-                'code': code
-            })
-
-        return blocks
+        return markdown_tokenizer.code_blocks(markdown_tokenizer.tokenize(content))
 
     def highlight_code(self, code: str, language: str = 'python') -> str:
         """Highlight code using Pygments."""
@@ -77,6 +179,21 @@ class MarkdownParser:
         formatter = TerminalFormatter()
         return highlight(code, lexer, formatter)
 
+    def _search_fields(self, blocks: list, content: str) -> dict:
+        """Search index fields from a document's blocks and raw content."""
+        headings = markdown_tokenizer.headings(blocks)
+
+        # Keep code (identifiers are worth finding) but drop link targets and markup
+        body = re.sub(r'\]\([^)]*\)', ']', content)
+        body = re.sub(r'```\w*|[#*`\[\]()<>|]', ' ', body)
+        body = re.sub(r'\s+', ' ', body)
+
+        return {
+            'title': markdown_tokenizer.title(blocks),
+            'headings': '\n'.join(heading['title'] for heading in headings),
+            'body': body.strip()
+        }
+
     def extract_text(self, content: str) -> str:
         """Extract plain text from markdown."""
         # Remove code blocks
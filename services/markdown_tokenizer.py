@@ -0,0 +1,202 @@
+import re
+
+# Block kinds; each block is a sequence starting with its kind:
+#   (HEADING, level, text)
+#   (PARAGRAPH, text)
+#   (LIST, start, items)     start is None for bullet lists, else the first number
+#   (CODE, language, code)
+#   (TABLE, rows)            rows of cell strings, header row first
+#   (RULE,)
+# Blocks are plain tuples of JSON types so a block list can go straight
+# into the parse cache (where the tuples come back as lists).
+HEADING = 'heading'
+PARAGRAPH = 'paragraph'
+LIST = 'list'
+CODE = 'code'
+TABLE = 'table'
+RULE = 'rule'
+
+_HEADING = re.compile(r' {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+_FENCE = re.compile(r'( *)(`{3,}|~{3,})(.*)')
+_SETEXT_UNDERLINE = re.compile(r' {0,3}(=+|-+)[ \t]*$')
+_RULE = re.compile(r' {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_LIST_ITEM = re.compile(r'(\s*)(?:[-*+]|(\d{1,9})[.)])(?:[ \t]+(.*)|$)')
+_TABLE_DELIMITER = re.compile(r'\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$')
+_LINK_TARGET = re.compile(r'\]\([^)]*\)')
+_WORD = re.compile(r"\w+(?:['’]\w+)*")
+
+
+def tokenize(content: str) -> list:
+    """Split markdown into a flat list of blocks in one pass over its lines.
+
+    Headings are only recognized outside fenced code, nested list items are
+    flattened into their list, and anything unrecognized is paragraph text.
+    """
+    lines = content.split('\n')
+    blocks = []
+    paragraph = []
+    i = 0
+    count = len(lines)
+    # Column where the last list's item text starts; fences indented past
+    # it by up to 3 spaces belong to that item
+    list_column = 0
+
+    def end_paragraph():
+        if paragraph:
+            blocks.append((PARAGRAPH, ' '.join(paragraph)))
+            paragraph.clear()
+
+    while i < count:
+        line = lines[i]
+        stripped = line.strip()
+
+        if not stripped:
+            end_paragraph()
+            i += 1
+            continue
+
+        if list_column and len(line) - len(line.lstrip()) < list_column:
+            list_column = 0
+
+        if paragraph:
+            underline = _SETEXT_UNDERLINE.match(line)
+            if underline:
+                # Setext heading: the paragraph so far is its text
+                blocks.append((HEADING, 1 if underline.group(1)[0] == '=' else 2, ' '.join(paragraph)))
+                paragraph.clear()
+                i += 1
+                continue
+
+        fence = _fence(line, list_column + 3)
+        if fence:
+            end_paragraph()
+            indent, marker, language = fence
+            code_lines = []
+            i += 1
+            # An unclosed fence runs to the end of the document
+            while i < count:
+                close = lines[i].strip()
+                if close.startswith(marker) and not close.strip(marker[0]) \
+                        and len(lines[i]) - len(lines[i].lstrip(' ')) <= list_column + 3:
+                    i += 1
+                    break
+                code_line = lines[i]
+                # Remove at most the fence's own indentation
+                code_lines.append(code_line[min(indent, len(code_line) - len(code_line.lstrip(' '))):])
+                i += 1
+            blocks.append((CODE, language or 'text', '\n'.join(code_lines)))
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            end_paragraph()
+            blocks.append((HEADING, len(heading.group(1)), (heading.group(2) or '').strip()))
+            i += 1
+            continue
+
+        if _RULE.match(line):
+            end_paragraph()
+            blocks.append((RULE,))
+            i += 1
+            continue
+
+        item = _LIST_ITEM.match(line)
+        if item:
+            end_paragraph()
+            start = int(item.group(2)) if item.group(2) else None
+            indent = len(item.group(1))
+            items = []
+            while i < count:
+                item = _LIST_ITEM.match(lines[i])
+                if item and not _RULE.match(lines[i]):
+                    if items and len(item.group(1)) <= indent and (item.group(2) is None) != (start is None):
+                        # A bullet list followed by a numbered one (or vice versa)
+                        break
+                    items.append((item.group(3) or '').strip())
+                    list_column = item.start(3) if item.group(3) is not None else len(lines[i])
+                elif items and lines[i][:1] in (' ', '\t') and lines[i].strip() \
+                        and not _fence(lines[i], list_column + 3):
+                    # Indented continuation of the previous item
+                    items[-1] = (items[-1] + ' ' + lines[i].strip()).strip()
+                else:
+                    break
+                i += 1
+            blocks.append((LIST, start, items))
+            continue
+
+        if '|' in line and i + 1 < count and '-' in lines[i + 1] and _TABLE_DELIMITER.match(lines[i + 1]):
+            end_paragraph()
+            rows = [_table_cells(line)]
+            i += 2
+            while i < count and '|' in lines[i] and lines[i].strip():
+                rows.append(_table_cells(lines[i]))
+                i += 1
+            blocks.append((TABLE, rows))
+            continue
+
+        paragraph.append(stripped)
+        i += 1
+
+    end_paragraph()
+    return blocks
+
+
+def _fence(line: str, max_indent: int):
+    """(indent, marker, language) if line opens a fenced code block, else None.
+
+    Backtick fences whose info string holds a backtick are inline code, not
+    fences, and fences indented further than max_indent are text.
+    """
+    fence = _FENCE.match(line)
+    if not fence or len(fence.group(1)) > max_indent:
+        return None
+    marker, info = fence.group(2), fence.group(3).strip()
+    if marker[0] == '`' and '`' in info:
+        return None
+    return len(fence.group(1)), marker, info.split()[0] if info else ''
+
+
+def _table_cells(line: str) -> list:
+    """Cell texts of a table row, without the outer pipes."""
+    row = line.strip()
+    if row.startswith('|'):
+        row = row[1:]
+    if row.endswith('|') and not row.endswith('\\|'):
+        row = row[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in re.split(r'(?<!\\)\|', row)]
+
+
+def headings(blocks: list) -> list:
+    """Heading outline of a block list: [{'level', 'title'}]."""
+    return [{'level': block[1], 'title': block[2]} for block in blocks if block[0] == HEADING]
+
+
+def title(blocks: list):
+    """Text of the first H1 in a block list, or None."""
+    for block in blocks:
+        if block[0] == HEADING and block[1] == 1 and block[2]:
+            return block[2]
+    return None
+
+
+def code_blocks(blocks: list) -> list:
+    """Fenced code blocks of a block list: [{'language', 'code'}]."""
+    return [{'language': block[1], 'code': block[2]} for block in blocks if block[0] == CODE]
+
+
+def word_count(blocks: list) -> int:
+    """Number of words in a block list's prose (headings, paragraphs, lists, tables), not code."""
+    texts = []
+    for block in blocks:
+        kind = block[0]
+        if kind == HEADING:
+            texts.append(block[2])
+        elif kind == PARAGRAPH:
+            texts.append(block[1])
+        elif kind == LIST:
+            texts.extend(block[2])
+        elif kind == TABLE:
+            texts.extend(cell for row in block[1] for cell in row)
+    # Link targets are not words
+    text = _LINK_TARGET.sub(']', '\n'.join(texts))
+    return len(_WORD.findall(text))
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class ParseCache:
+    """Two-tier cache of MarkdownParser results keyed by content hash.
+
+    The memory tier is an LRU bounded by max_memory_bytes. The disk tier
+    keeps one JSON file per entry under cache_dir so results survive
+    restarts; it is bounded by max_disk_bytes and evicts the least recently
+    used files (by mtime, refreshed on every disk hit). Keys include a
+    version string so a change to the parser's output invalidates old
+    entries instead of serving them.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        """Initialize cache; with no cache_dir only the memory tier is used."""
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # Disk entries by file name, least recently used first; loaded on first use
+        self._disk = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(content: str, version: str = "") -> str:
+        """Cache key for a document's content."""
+        digest = hashlib.sha256(version.encode('utf-8'))
+        digest.update(content.encode('utf-8', errors='surrogatepass'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Get a cached result, checking memory then disk."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+
+        value, size = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store_memory(key, value, size)
+        return value
+
+    def put(self, key: str, value: dict):
+        """Cache a result in both tiers; value must be JSON serializable."""
+        data = json.dumps(value, separators=(',', ':'))
+        with self._lock:
+            self._store_memory(key, value, len(data))
+        self._write_disk(key, data)
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._load_disk_index()
+            for name in list(self._disk):
+                self._remove_disk(name)
+
+    def stats(self) -> dict:
+        """Get hit/miss counters, hit rate and the size of each tier."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes
+            }
+
+    def _store_memory(self, key: str, value: dict, size: int):
+        """Insert into the memory tier and evict least recently used entries over the cap.
+
+        size is the entry's serialized length, used as its memory estimate.
+        """
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        self._memory[key] = (value, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self.evictions += 1
+
+    def _path(self, name: str) -> str:
+        """File path of a disk entry."""
+        return os.path.join(self.cache_dir, name)
+
+    def _read_disk(self, key: str) -> tuple:
+        """Load (value, size) from the disk tier and mark it recently used; (None, 0) if absent."""
+        if self.cache_dir is None:
+            return None, 0
+        name = key + '.json'
+        try:
+            with open(self._path(name), 'r', encoding='utf-8') as f:
+                data = f.read()
+            value = json.loads(data)
+            os.utime(self._path(name))
+        except (OSError, ValueError):
+            return None, 0
+        with self._lock:
+            self._load_disk_index()
+            if name in self._disk:
+                self._disk.move_to_end(name)
+        return value, len(data)
+
+    def _write_disk(self, key: str, data: str):
+        """Write an entry to the disk tier atomically, then enforce the size cap."""
+        if self.cache_dir is None:
+            return
+        name = key + '.json'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(name))
+        except OSError:
+            return
+
+        size = len(data.encode('utf-8'))
+        with self._lock:
+            self._load_disk_index()
+            self._disk_bytes -= self._disk.pop(name, 0)
+            self._disk[name] = size
+            self._disk_bytes += size
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                self._remove_disk(next(iter(self._disk)))
+                self.evictions += 1
+
+    def _load_disk_index(self):
+        """Index the disk tier's files, least recently used first (once)."""
+        if self._disk is not None:
+            return
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json') and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+
+    def _remove_disk(self, name: str):
+        """Delete a disk entry."""
+        self._disk_bytes -= self._disk.pop(name, 0)
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            pass
@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Iterable, Optional
+from services.markdown_parser import MarkdownParser
+from services.parse_cache import ParseCache
+
+
+# Parser owned by a worker process, created by _init_worker
+_worker_parser = None
+
+
+def _init_worker():
+    """Create the worker process's parser."""
+    global _worker_parser
+    _worker_parser = MarkdownParser()
+
+
+def _parse_chunk(contents: list, fields: tuple) -> list:
+    """Parse a chunk of documents in a worker process."""
+    results = []
+    for content in contents:
+        document = _worker_parser.document(content)
+        results.append({field: document.get(field) for field in fields})
+    return results
+
+
+class ParserPool:
+    """Thread-safe pool of MarkdownParser instances with a process pool for batches.
+
+    Threads check parsers out with parser() and get exclusive use of one, so
+    parsing on several threads never shares a markdown.Markdown instance.
+    parse_many() spreads a batch over worker processes, each holding its
+    own parser, so CPU-bound conversion scales with the number of cores
+    instead of being serialized by the GIL. Worker processes are started
+    on the first large batch and kept until close().
+    """
+
+    # Batches with fewer uncached documents are parsed in the calling thread
+    MIN_PROCESS_BATCH = 32
+    # Documents sent to a worker process per task
+    CHUNK_SIZE = 16
+
+    def __init__(self, size: Optional[int] = None, processes: Optional[int] = None,
+                 cache: Optional[ParseCache] = None):
+        """Initialize pool; size and processes default to the number of CPUs."""
+        self.size = size or os.cpu_count() or 1
+        self.processes = processes or os.cpu_count() or 1
+        self.cache = cache
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def parser(self):
+        """Check out a parser for exclusive use, waiting if all are in use."""
+        parser = self._acquire()
+        try:
+            yield parser
+        finally:
+            self._idle.put(parser)
+
+    def parse_many(self, contents: Iterable[str], fields: tuple = ('title', 'headings', 'html')) -> list:
+        """Parse several documents; returns one {field: value} dict per document, in order.
+
+        Fields already in the parse cache are not recomputed, and newly
+        computed ones are added to it.
+        """
+        contents = list(contents)
+        results = [None] * len(contents)
+        pending = []
+        for index, content in enumerate(contents):
+            entry = self._cached(content)
+            if entry is not None and all(field in entry for field in fields):
+                results[index] = {field: entry[field] for field in fields}
+            else:
+                pending.append(index)
+
+        if self.processes > 1 and len(pending) >= self.MIN_PROCESS_BATCH:
+            pending = self._parse_in_processes(contents, pending, fields, results)
+
+        if pending:
+            with self.parser() as parser:
+                for index in pending:
+                    document = parser.document(contents[index])
+                    results[index] = {field: document.get(field) for field in fields}
+                    document.save()
+        return results
+
+    def close(self):
+        """Stop the worker processes once work already submitted is done.
+
+        Batches other threads are waiting on are not cancelled; parse_many
+        starts new workers if called again.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _acquire(self) -> MarkdownParser:
+        """Take an idle parser, creating one while under the size limit."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return MarkdownParser(cache=self.cache)
+        return self._idle.get()
+
+    def _cached(self, content: str) -> Optional[dict]:
+        """Parse cache entry for content, if any."""
+        if self.cache is None:
+            return None
+        return self.cache.get(ParseCache.key_for(content, MarkdownParser.CACHE_VERSION))
+
+    def _parse_in_processes(self, contents: list, pending: list, fields: tuple, results: list) -> list:
+        """Parse pending documents on the worker processes; returns the indexes left unparsed.
+
+        Chunks whose task could not be submitted or did not complete
+        (cancelled, a worker died or the parse raised) are left for the
+        calling thread.
+        """
+        chunks = [pending[start:start + self.CHUNK_SIZE] for start in range(0, len(pending), self.CHUNK_SIZE)]
+        left = []
+        submitted = []
+        try:
+            executor = self._get_executor()
+        except OSError:
+            return pending
+        for chunk in chunks:
+            try:
+                future = executor.submit(_parse_chunk, [contents[index] for index in chunk], fields)
+                submitted.append((chunk, future))
+            except (BrokenProcessPool, RuntimeError, OSError):
+                # Broken, or closed by another caller
+                left.extend(chunk)
+
+        broken = False
+        for chunk, future in submitted:
+            try:
+                parsed = future.result()
+            except Exception as e:
+                broken = broken or isinstance(e, BrokenProcessPool)
+                left.extend(chunk)
+                continue
+            for index, result in zip(chunk, parsed):
+                results[index] = result
+                self._store(contents[index], result)
+        if broken:
+            self._discard_executor(executor)
+        return left
+
+    def _store(self, content: str, result: dict):
+        """Merge fields computed by a worker into the parse cache."""
+        if self.cache is None:
+            return
+        key = ParseCache.key_for(content, MarkdownParser.CACHE_VERSION)
+        self.cache.put(key, dict(self.cache.get(key) or {}, **result))
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Stop using a broken executor; the next batch starts a new one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the worker processes on first use."""
+        with self._lock:
+            if self._executor is None:
+                # Spawn rather than fork: the app runs threads and holds open database connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+            return self._executor
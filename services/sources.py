@@ -0,0 +1,130 @@
+import os
+import hashlib
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from typing import Optional
+from services.downloader import Downloader, ProgressCallback
+
+
+class DocumentSource:
+    """Base class for a place topic documentation is synced from.
+
+    fetch() returns the same result dict as Downloader.fetch_archive and
+    extract_changes() returns the same changeset as
+    Downloader.extract_markdown_changes, so every source feeds the same
+    extraction and indexing pipeline.
+    """
+
+    # Whether syncing needs the network
+    is_remote = True
+
+    def __init__(self, location: str):
+        """Initialize source for a URL or path."""
+        self.location = location
+
+    def fetch(self, branch: Optional[str] = None, progress_callback: Optional[ProgressCallback] = None,
+              validators: Optional[dict] = None, staging_dir: Optional[str] = None) -> dict:
+        """Fetch the documentation archive."""
+        raise NotImplementedError
+
+    def extract_changes(self, result: dict, target_dir: str, subfolder: Optional[str] = None,
+                        known: Optional[dict] = None,
+                        progress_callback: Optional[ProgressCallback] = None,
+                        staging_dir: Optional[str] = None) -> dict:
+        """Extract new or changed markdown files from a fetch result."""
+        return Downloader.extract_markdown_changes(result['archive'], target_dir, subfolder,
+                                                   known, progress_callback, staging_dir)
+
+    def fetch_fallback(self, target_dir: str, subfolder: Optional[str] = None,
+                       branch: Optional[str] = None) -> list:
+        """Fetch documents to use when the source holds no markdown."""
+        return []
+
+
+class GitHubSource(DocumentSource):
+    """A repository on GitHub, downloaded as a branch archive."""
+
+    def fetch(self, branch=None, progress_callback=None, validators=None, staging_dir=None) -> dict:
+        """Download the branch archive."""
+        return Downloader.fetch_archive(self.location, branch, progress_callback, validators, staging_dir)
+
+    def fetch_fallback(self, target_dir, subfolder=None, branch=None) -> list:
+        """Fetch the README directly from raw.githubusercontent.com."""
+        return Downloader.fetch_readme_fallback(self.location, target_dir, subfolder,
+                                                [branch] if branch else None)
+
+
+class HttpArchiveSource(DocumentSource):
+    """A ZIP archive served from any HTTP(S) URL."""
+
+    def fetch(self, branch=None, progress_callback=None, validators=None, staging_dir=None) -> dict:
+        """Download the archive."""
+        return Downloader.fetch_url_archive(self.location, progress_callback, validators, staging_dir)
+
+
+class LocalArchiveSource(DocumentSource):
+    """A ZIP archive on the local filesystem."""
+
+    is_remote = False
+
+    def fetch(self, branch=None, progress_callback=None, validators=None, staging_dir=None) -> dict:
+        """Open the archive; unchanged if its size and mtime match the last sync."""
+        stat = os.stat(self.location)
+        current = {'etag': f"{stat.st_size}-{stat.st_mtime_ns}", 'last_modified': None, 'size': stat.st_size}
+        if validators and validators.get('etag') == current['etag']:
+            return {'archive': None, 'branch': None, 'not_modified': True, 'validators': validators}
+        return {'archive': open(self.location, 'rb'), 'branch': None,
+                'not_modified': False, 'validators': current}
+
+
+class LocalDirectorySource(DocumentSource):
+    """A local checkout directory, read in place."""
+
+    is_remote = False
+
+    def fetch(self, branch=None, progress_callback=None, validators=None, staging_dir=None) -> dict:
+        """Fingerprint the directory; unchanged if no markdown file was added, removed or touched."""
+        signature = hashlib.sha1()
+        for root, dirs, files in os.walk(self.location):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for file in sorted(files):
+                if file.endswith('.md'):
+                    stat = os.stat(os.path.join(root, file))
+                    signature.update(f"{os.path.join(root, file)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        current = {'etag': signature.hexdigest(), 'last_modified': None, 'size': None}
+        if validators and validators.get('etag') == current['etag']:
+            return {'archive': None, 'branch': None, 'not_modified': True, 'validators': validators}
+        return {'archive': None, 'branch': None, 'not_modified': False, 'validators': current}
+
+    def extract_changes(self, result, target_dir, subfolder=None, known=None, progress_callback=None,
+                        staging_dir=None) -> dict:
+        """Copy new or changed markdown files out of the directory."""
+        return Downloader.extract_directory_changes(self.location, target_dir, subfolder,
+                                                    known, progress_callback, staging_dir)
+
+
+def local_path_from_url(url: str) -> Optional[str]:
+    """Return the filesystem path for a file:// URL or plain path, else None."""
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        return url2pathname(parsed.netloc + parsed.path if parsed.netloc else parsed.path)
+    if parsed.scheme in ('http', 'https'):
+        return None
+    # Plain paths (including Windows drive letters, which parse as a scheme)
+    return os.path.expanduser(url)
+
+
+def source_for_url(url: str) -> DocumentSource:
+    """Pick the documentation source implementation for a topic URL or path."""
+    url = url.strip()
+    if url.startswith(Downloader.GITHUB_BASE_URL):
+        return GitHubSource(url)
+
+    path = local_path_from_url(url)
+    if path is None:
+        return HttpArchiveSource(url)
+    if os.path.isdir(path):
+        return LocalDirectorySource(path)
+    if os.path.isfile(path):
+        return LocalArchiveSource(path)
+    raise ValueError(f"Source not found: {url}")
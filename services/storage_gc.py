@@ -0,0 +1,190 @@
+import os
+import shutil
+import threading
+import time
+from typing import Optional, Callable
+from services.downloader import Downloader
+
+
+class StorageCollector:
+    """Finds and reclaims storage no longer referenced by any topic.
+
+    Garbage is:
+    - document and search index rows whose topic or document was deleted,
+    - entries in the docs directory that belong to no topic (folders of
+      deleted topics and their leftover staging directories),
+    - files inside a topic's folder that are not one of its documents,
+    - free pages in the database file.
+
+    Topics for which is_busy(topic_id) returns True (e.g. syncing) are left
+    alone, as are staging directories of existing topics, which hold
+    resumable downloads. Since a sync can start while collect() runs, each
+    stray path is checked again right before it is deleted.
+    """
+
+    # Pages released per incremental vacuum step
+    VACUUM_STEP_PAGES = 256
+
+    def __init__(self, db, docs_dir: str, is_busy: Optional[Callable[[int], bool]] = None):
+        """Initialize collector for a database and docs directory."""
+        self.db = db
+        self.docs_dir = os.path.abspath(docs_dir)
+        self.is_busy = is_busy or (lambda topic_id: False)
+        self._stop = threading.Event()
+
+    def scan(self) -> dict:
+        """Report what collect() would reclaim, without changing anything."""
+        stray = self._stray_paths()
+        return {
+            'orphan_rows': self.db.count_orphans(),
+            'stray_paths': [path for path, _, _ in stray],
+            'stray_bytes': sum(size for _, size, _ in stray),
+            'free_db_bytes': self.db.get_free_bytes()
+        }
+
+    def collect(self) -> dict:
+        """Delete orphan rows and stray files, then shrink the database file.
+
+        Returns counts and the bytes reclaimed on disk.
+        """
+        self._stop.clear()
+        orphan_rows = self.db.delete_orphans()
+
+        files_removed = 0
+        file_bytes = 0
+        scan_started = time.time()
+        for path, size, topic_id in self._stray_paths():
+            if self._stop.is_set():
+                break
+            if not self._still_stray(path, topic_id, scan_started):
+                continue
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError:
+                continue
+            files_removed += 1
+            file_bytes += size
+        self._remove_empty_topic_folders()
+
+        db_bytes = self.db.reclaim_space(self.VACUUM_STEP_PAGES, should_stop=self._stop.is_set)
+        return {
+            'orphan_rows': orphan_rows,
+            'files_removed': files_removed,
+            'file_bytes': file_bytes,
+            'db_bytes': db_bytes,
+            'bytes_reclaimed': file_bytes + db_bytes
+        }
+
+    def collect_in_background(self, on_done: Optional[Callable[[dict], None]] = None,
+                              on_error: Optional[Callable[[Exception], None]] = None) -> threading.Thread:
+        """Run collect() on a background thread; callbacks run on that thread."""
+        def run():
+            try:
+                report = self.collect()
+            except Exception as e:
+                if on_error is not None:
+                    on_error(e)
+                return
+            if on_done is not None:
+                on_done(report)
+
+        thread = threading.Thread(target=run, name="storage-gc", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Ask a running collect() to stop after its current step."""
+        self._stop.set()
+
+    def _topic_paths(self) -> dict:
+        """Map each topic's normalized local path to the topic row."""
+        return {os.path.normpath(os.path.abspath(topic['local_path'])): topic
+                for topic in self.db.get_all_topics()}
+
+    def _owned_paths(self, topics: dict) -> set:
+        """Top-level docs directory entries that belong to a topic."""
+        owned = set(topics)
+        owned.update(Downloader.staging_dir_for(path) for path in topics)
+        return owned
+
+    def _stray_paths(self) -> list:
+        """List (path, size, topic_id) for every stray entry under the docs directory.
+
+        topic_id is the topic whose folder holds the entry, or None for
+        top-level entries that belong to no topic.
+        """
+        stray = []
+        if not os.path.isdir(self.docs_dir):
+            return stray
+        topics = self._topic_paths()
+        owned = self._owned_paths(topics)
+
+        # Top level: folders and staging directories of deleted topics
+        for name in sorted(os.listdir(self.docs_dir)):
+            path = os.path.join(self.docs_dir, name)
+            if path not in owned:
+                stray.append((path, self._size(path), None))
+
+        # Inside each topic folder: files that are not one of its documents
+        for local_path, topic in topics.items():
+            if os.path.dirname(local_path) != self.docs_dir or not os.path.isdir(local_path):
+                continue
+            if self.is_busy(topic['id']):
+                continue
+            documents = self.db.get_document_file_paths(topic['id'])
+            for root, dirs, files in os.walk(local_path):
+                for file in files:
+                    path = os.path.join(root, file)
+                    if os.path.normpath(os.path.abspath(path)) not in documents:
+                        stray.append((path, self._size(path), topic['id']))
+        return stray
+
+    def _still_stray(self, path: str, topic_id: Optional[int], scan_started: float) -> bool:
+        """Check that a stray path found by the scan is still safe to delete.
+
+        A sync moves files into place before it registers them, so the
+        path's topic must not have become busy, a top-level entry must not
+        have been claimed by a new topic, and the path must not have been
+        modified since the scan started.
+        """
+        if topic_id is not None:
+            if self.is_busy(topic_id):
+                return False
+        elif path in self._owned_paths(self._topic_paths()):
+            return False
+        try:
+            return os.lstat(path).st_mtime < scan_started
+        except OSError:
+            return False
+
+    def _remove_empty_topic_folders(self):
+        """Remove subfolders of topic folders left empty by collect()."""
+        for local_path, topic in self._topic_paths().items():
+            if os.path.dirname(local_path) != self.docs_dir or self.is_busy(topic['id']):
+                continue
+            for root, dirs, files in os.walk(local_path, topdown=False):
+                if root != local_path and not os.listdir(root):
+                    try:
+                        os.rmdir(root)
+                    except OSError:
+                        pass
+
+    @staticmethod
+    def _size(path: str) -> int:
+        """Size of a file, or of everything under a directory, in bytes."""
+        if not os.path.isdir(path) or os.path.islink(path):
+            try:
+                return os.lstat(path).st_size
+            except OSError:
+                return 0
+        total = 0
+        for root, dirs, files in os.walk(path):
+            for file in files:
+                try:
+                    total += os.lstat(os.path.join(root, file)).st_size
+                except OSError:
+                    pass
+        return total
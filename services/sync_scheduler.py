@@ -0,0 +1,328 @@
+import threading
+import zipfile
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Callable
+from services.downloader import Downloader, ProgressThrottle
+from services.parser_pool import ParserPool
+from services.document_catalog import default_title
+from services.sources import source_for_url
+
+
+# Status callbacks receive (topic_id, status, detail)
+StatusCallback = Callable[[int, str, str], None]
+# Progress callbacks receive (topic_id, phase, done, total)
+TopicProgressCallback = Callable[[int, str, int, int], None]
+
+
+class SyncScheduler:
+    """Runs topic syncs concurrently with a bounded number of workers.
+
+    Each sync is split into two stages that run on separate worker pools:
+    downloading the archive (network bound) and extracting/registering its
+    documents (disk and database bound). This lets one topic's download
+    overlap with another topic's extraction. The extraction stage ends by
+    analyzing the documents' content (titles, outlines, word counts, code
+    languages and the search index) on the shared parser pool.
+    """
+
+    QUEUED = 'queued'
+    DOWNLOADING = 'downloading'
+    EXTRACTING = 'extracting'
+    ANALYZING = 'analyzing'
+    DONE = 'done'
+    UP_TO_DATE = 'up_to_date'
+    ERROR = 'error'
+
+    FINISHED_STATES = (DONE, UP_TO_DATE, ERROR)
+
+    def __init__(self, db, max_downloads: int = 4, max_extractions: int = 2,
+                 on_status: Optional[StatusCallback] = None,
+                 on_progress: Optional[TopicProgressCallback] = None):
+        """Initialize scheduler with worker limits and optional listeners.
+
+        Callbacks are invoked from worker threads.
+        """
+        self.db = db
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.status = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        # Set by shutdown(); running stages stop at their next progress update
+        self._stopping = threading.Event()
+        self._download_pool = ThreadPoolExecutor(max_workers=max_downloads, thread_name_prefix="sync-download")
+        self._extract_pool = ThreadPoolExecutor(max_workers=max_extractions, thread_name_prefix="sync-extract")
+        # Shared by the extraction workers to parse documents on all cores
+        self.parser_pool = ParserPool()
+
+    def submit(self, topic_id: int) -> Future:
+        """Queue a topic for syncing; returns the pending sync's future.
+
+        Submitting a topic that is already syncing returns the existing future.
+        """
+        with self._lock:
+            if topic_id in self._active:
+                return self._active[topic_id]
+            future = Future()
+            self._active[topic_id] = future
+
+        self._set_status(topic_id, self.QUEUED)
+        self._download_pool.submit(self._download_stage, topic_id, future)
+        return future
+
+    def submit_all(self, topic_ids: list) -> list:
+        """Queue several topics for syncing."""
+        return [self.submit(topic_id) for topic_id in topic_ids]
+
+    def is_syncing(self, topic_id: int) -> bool:
+        """Check whether a topic is queued or syncing."""
+        with self._lock:
+            return topic_id in self._active
+
+    def active_count(self) -> int:
+        """Number of topics queued or syncing."""
+        with self._lock:
+            return len(self._active)
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work, cancel syncs that have not started and stop running ones.
+
+        Running stages stop at their next progress update and listeners are
+        no longer notified. With wait, returns once every stage has exited,
+        so the database can be closed safely afterwards.
+        """
+        self._stopping.set()
+        # Downloads hand off to the extraction pool, so drain them first
+        self._download_pool.shutdown(wait=wait, cancel_futures=True)
+        self._extract_pool.shutdown(wait=wait, cancel_futures=True)
+        self.parser_pool.close()
+
+    def _set_status(self, topic_id: int, status: str, detail: str = ""):
+        """Record a topic's status and notify the listener."""
+        self.status[topic_id] = (status, detail)
+        if self.on_status is not None and not self._stopping.is_set():
+            self.on_status(topic_id, status, detail)
+
+    def _progress_for(self, topic_id: int):
+        """Build a downloader progress callback tagged with the topic.
+
+        The callback raises once the scheduler is shutting down, which
+        stops the stage reporting progress.
+        """
+        def progress(phase, done, total):
+            self._check_stopping()
+            if self.on_progress is not None:
+                self.on_progress(topic_id, phase, done, total)
+        return progress
+
+    def _check_stopping(self):
+        """Raise if the scheduler is shutting down."""
+        if self._stopping.is_set():
+            raise RuntimeError("Sync stopped: scheduler is shutting down")
+
+    def _finish(self, topic_id: int, future: Future, result: Optional[dict] = None,
+                error: Optional[Exception] = None):
+        """Mark a sync finished and resolve its future."""
+        with self._lock:
+            self._active.pop(topic_id, None)
+
+        if error is not None:
+            self._set_status(topic_id, self.ERROR, str(error))
+            future.set_exception(error)
+        else:
+            self._set_status(topic_id, result['status'], result['detail'])
+            future.set_result(result)
+
+    def _download_stage(self, topic_id: int, future: Future):
+        """Fetch the topic's archive, then hand it to the extraction pool."""
+        try:
+            self._check_stopping()
+            topic = self.db.get_topic(topic_id)
+            if not topic:
+                raise ValueError(f"Topic {topic_id} not found")
+
+            self._set_status(topic_id, self.DOWNLOADING)
+            validators = self.db.get_topic_validators(topic_id)
+            staging_dir = Downloader.staging_dir_for(topic['local_path'])
+            source = source_for_url(topic['github_url'])
+            result = source.fetch(topic['branch'],
+                                  progress_callback=self._progress_for(topic_id),
+                                  validators=validators,
+                                  staging_dir=staging_dir)
+            result['source'] = source
+            if result['branch'] and result['branch'] != topic['branch']:
+                self.db.set_topic_branch(topic_id, result['branch'])
+        except Exception as e:
+            self._finish(topic_id, future, error=e)
+            return
+
+        if result['not_modified']:
+            # Upstream archive unchanged since the last sync; only catch up metadata and the search index
+            Downloader.clear_staging(staging_dir)
+            try:
+                self._set_status(topic_id, self.ANALYZING)
+                extract_metadata(self.db, topic_id, parser_pool=self.parser_pool,
+                                 progress_callback=self._progress_for(topic_id))
+            except Exception as e:
+                self._finish(topic_id, future, error=e)
+                return
+            self._finish(topic_id, future, {
+                'topic_id': topic_id,
+                'status': self.UP_TO_DATE,
+                'detail': "Already up to date",
+                'changes': None
+            })
+            return
+
+        try:
+            self._extract_pool.submit(self._extract_stage, topic, result, future)
+        except RuntimeError as e:
+            # Scheduler was shut down while this topic was downloading
+            if result['archive'] is not None:
+                result['archive'].close()
+            self._finish(topic_id, future, error=e)
+
+    def _extract_stage(self, topic, result: dict, future: Future):
+        """Extract changed files and register them in the database."""
+        topic_id = topic['id']
+        archive = result['archive']
+        source = result['source']
+        staging_dir = Downloader.staging_dir_for(topic['local_path'])
+        try:
+            self._set_status(topic_id, self.EXTRACTING)
+            try:
+                self._check_stopping()
+                # Extract only new or changed files
+                known = self.db.get_document_fingerprints(topic_id)
+                changes = source.extract_changes(result, topic['local_path'], topic['subfolder'],
+                                                 known, progress_callback=self._progress_for(topic_id),
+                                                 staging_dir=staging_dir)
+            except zipfile.BadZipFile:
+                # A corrupt staged archive must not be resumed again
+                archive.close()
+                Downloader.clear_staging(staging_dir)
+                raise
+            finally:
+                if archive is not None:
+                    archive.close()
+
+            if not (changes['added'] or changes['modified'] or changes['unchanged']):
+                # Source holds no documentation; fall back to the README
+                fallback = source.fetch_fallback(topic['local_path'], topic['subfolder'], result['branch'])
+                for file_info in fallback:
+                    if file_info['relative_path'] in changes['removed']:
+                        changes['removed'].remove(file_info['relative_path'])
+                        changes['modified'].append(file_info)
+                    else:
+                        changes['added'].append(file_info)
+
+            # Swap the new document set in: files first, then rows in one transaction
+            Downloader.commit_staged_changes(changes, topic['local_path'])
+            register_changes(self.db, topic_id, changes)
+            self._check_stopping()
+            self._set_status(topic_id, self.ANALYZING)
+            extract_metadata(self.db, topic_id, changes['modified'], self.parser_pool,
+                             self._progress_for(topic_id))
+            self.db.set_topic_validators(topic_id, result['validators'])
+            self.db.update_topic_timestamp(topic_id)
+            Downloader.clear_staging(staging_dir)
+        except Exception as e:
+            self._finish(topic_id, future, error=e)
+            return
+
+        total = len(changes['added']) + len(changes['modified']) + len(changes['unchanged'])
+        summary = f"+{len(changes['added'])} ~{len(changes['modified'])} -{len(changes['removed'])}"
+        self._finish(topic_id, future, {
+            'topic_id': topic_id,
+            'status': self.DONE,
+            'detail': f"Synced {total} files ({summary})",
+            'changes': changes
+        })
+
+
+def register_changes(db, topic_id: int, changes: dict):
+    """Make the topic's document rows match an extraction changeset in one transaction."""
+    db.replace_topic_documents(topic_id, (
+        {
+            'title': default_title(file_info['relative_path'].split('/')[-1]),
+            'filename': file_info['relative_path'].split('/')[-1],
+            'file_path': file_info['local_path'],
+            'relative_path': file_info['relative_path'],
+            'crc32': file_info['crc32'],
+            'file_size': file_info['size']
+        }
+        for file_info in changes['added'] + changes['modified'] + changes['unchanged']
+    ))
+
+
+# Documents read and parsed per metadata and search index transaction
+METADATA_BATCH_SIZE = 500
+
+
+def extract_metadata(db, topic_id: int, changed: list = (), parser_pool: Optional[ParserPool] = None,
+                     progress_callback=None):
+    """Parse documents and store their metadata and search index rows.
+
+    Covers documents whose metadata is missing or was extracted from older
+    content, plus changed (extraction entries for files whose content
+    changed) and unindexed documents for the search index. Each document
+    gets its real title (first H1, else one derived from the file name),
+    heading outline, word count and code block languages. Files are read
+    and parsed (in parallel on parser_pool, if given) in batches outside
+    the write transactions so other syncs are not held up.
+    """
+    has_search = db.has_full_text_search()
+    files = {file_info['relative_path']: file_info['local_path'] for file_info in changed}
+    files.update((row['relative_path'], row['file_path']) for row in db.get_documents_without_metadata(topic_id))
+    if has_search:
+        files.update((row['relative_path'], row['file_path']) for row in db.get_unindexed_documents(topic_id))
+    if not files:
+        return
+
+    fields = ('headings', 'code_blocks', 'word_count') + (('search_fields',) if has_search else ())
+    if parser_pool is None:
+        parser_pool = ParserPool(size=1, processes=1)
+    progress = ProgressThrottle(progress_callback, 'analyze', len(files))
+    pending = iter(files.items())
+    while True:
+        chunk = list(islice(pending, METADATA_BATCH_SIZE))
+        if not chunk:
+            break
+        paths = []
+        contents = []
+        for relative_path, local_path in chunk:
+            try:
+                with open(local_path, 'r', encoding='utf-8', errors='replace') as f:
+                    contents.append(f.read())
+            except OSError:
+                continue
+            paths.append(relative_path)
+
+        metadata = []
+        search_rows = []
+        for relative_path, parsed in zip(paths, parser_pool.parse_many(contents, fields)):
+            title = next((heading['title'] for heading in parsed['headings']
+                          if heading['level'] == 1 and heading['title']), None)
+            languages = {}
+            for block in parsed['code_blocks']:
+                language = block['language'].lower()
+                if language != 'text':
+                    languages[language] = languages.get(language, 0) + 1
+            metadata.append({
+                'relative_path': relative_path,
+                'title': title or default_title(relative_path.split('/')[-1]),
+                'headings': parsed['headings'],
+                'word_count': parsed['word_count'],
+                'languages': languages
+            })
+            if has_search:
+                search_fields = parsed['search_fields']
+                search_fields['relative_path'] = relative_path
+                search_rows.append(search_fields)
+
+        db.set_document_metadata(topic_id, metadata)
+        if has_search:
+            db.index_documents(topic_id, search_rows)
+        progress.advance(len(chunk))
+    progress.finish()
@@ -0,0 +1,206 @@
+"""Downloader tests against a local HTTP stand-in for GitHub.
+
+Run from the project root:
+
+    python -m unittest discover tests
+"""
+import http.server
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from services.downloader import Downloader
+
+
+def make_archive(branch: str) -> bytes:
+    """An uncompressed repository archive as GitHub would serve it, a few download chunks long."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        for i in range(3):
+            zf.writestr(f"repo-{branch}/docs/page_{i}.md", f"# Page {i}\n\n" + "text " * 20000)
+    return buffer.getvalue()
+
+
+class StandIn(http.server.ThreadingHTTPServer):
+    """GitHub stand-in serving /owner/repo/archive/refs/heads/<branch>.zip.
+
+    branches maps a branch name to {'status', 'delay', 'truncate'}; branches
+    not listed answer 404. 200 responses honour Range requests, and
+    truncate cuts the next response off after that many bytes.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.branches = {}
+        self.archives = {}
+        self.requests = []
+
+    def archive(self, branch: str) -> bytes:
+        if branch not in self.archives:
+            self.archives[branch] = make_archive(branch)
+        return self.archives[branch]
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler for StandIn."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        branch = self.path.rsplit('/', 1)[-1][:-len('.zip')]
+        self.server.requests.append((branch, dict(self.headers)))
+        behaviour = self.server.branches.get(branch)
+        if behaviour is None:
+            self._send(404)
+            return
+        time.sleep(behaviour.get('delay', 0))
+        if behaviour.get('status', 200) != 200:
+            self._send(behaviour['status'])
+            return
+
+        body = self.server.archive(branch)
+        etag = f'"{branch}-v1"'
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range') == etag:
+            start = int(range_header.split('=')[1].split('-')[0])
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+            body = body[start:]
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        truncate = behaviour.pop('truncate', None)
+        self.wfile.write(body if truncate is None else body[:truncate])
+
+    def _send(self, status: int):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class DownloaderTestCase(unittest.TestCase):
+    """Points the downloader at a fresh stand-in for every test."""
+
+    def setUp(self):
+        self.server = StandIn()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = Downloader.GITHUB_BASE_URL
+        Downloader.GITHUB_BASE_URL = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        Downloader.configure_session(max_retries=0)
+        self.repo_url = Downloader.GITHUB_BASE_URL + "owner/repo"
+
+    def tearDown(self):
+        Downloader.GITHUB_BASE_URL = self.base_url
+        Downloader.configure_session(max_retries=3)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def requested_branches(self) -> list:
+        return [branch for branch, _ in self.server.requests]
+
+
+class BranchResolutionTest(DownloaderTestCase):
+    """Known-branch handling and concurrent probing."""
+
+    def test_probe_prefers_higher_priority_branch(self):
+        self.server.branches = {'main': {'delay': 0.3}, 'develop': {}}
+        result = Downloader.fetch_archive(self.repo_url)
+        result['archive'].close()
+        self.assertEqual(result['branch'], 'main')
+
+    def test_probe_falls_back_when_better_branches_are_missing(self):
+        self.server.branches = {'dev': {}}
+        result = Downloader.fetch_archive(self.repo_url)
+        result['archive'].close()
+        self.assertEqual(result['branch'], 'dev')
+
+    def test_known_branch_is_tried_alone(self):
+        self.server.branches = {'main': {}, 'dev': {}}
+        result = Downloader.fetch_archive(self.repo_url, branch='dev')
+        result['archive'].close()
+        self.assertEqual(result['branch'], 'dev')
+        self.assertEqual(self.requested_branches(), ['dev'])
+
+    def test_known_branch_failure_does_not_switch_branch(self):
+        self.server.branches = {'master': {}, 'dev': {'status': 503}}
+        with self.assertRaises(Exception):
+            Downloader.fetch_archive(self.repo_url, branch='dev')
+        self.assertEqual(self.requested_branches(), ['dev'])
+
+    def test_deleted_known_branch_is_reprobed(self):
+        self.server.branches = {'master': {}}
+        result = Downloader.fetch_archive(self.repo_url, branch='dev')
+        result['archive'].close()
+        self.assertEqual(result['branch'], 'master')
+
+
+class ResumeTest(DownloaderTestCase):
+    """Staged downloads resumed with Range requests."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.staging_dir = os.path.join(self.tmp.name, 'topic.staging')
+        self.server.branches = {'main': {}}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def fetch(self) -> bytes:
+        result = Downloader.fetch_archive(self.repo_url, branch='main', staging_dir=self.staging_dir)
+        with result['archive'] as archive:
+            return archive.read()
+
+    def test_interrupted_download_resumes(self):
+        self.server.branches['main']['truncate'] = 2 * Downloader.CHUNK_SIZE + 100
+        with self.assertRaises(Exception):
+            self.fetch()
+        part_path, _ = Downloader._staging_paths(self.staging_dir)
+        offset = os.path.getsize(part_path)
+        self.assertGreater(offset, 0)
+
+        self.assertEqual(self.fetch(), self.server.archive('main'))
+        _, headers = self.server.requests[-1]
+        self.assertEqual(headers.get('Range'), f"bytes={offset}-")
+
+    def test_complete_staged_archive_is_reused(self):
+        body = self.fetch()
+        # A later step failed, so the staging directory was not cleared
+        self.assertEqual(self.fetch(), body)
+        self.assertEqual(self.requested_branches(), ['main'])
+
+    def test_rejected_range_restarts_download(self):
+        self.fetch()
+        _, meta_path = Downloader._staging_paths(self.staging_dir)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        # Staged without a known length, so it cannot be recognized as complete
+        meta['total'] = 0
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        self.assertEqual(self.fetch(), self.server.archive('main'))
+        self.assertEqual(self.requested_branches(), ['main', 'main', 'main'])
+        self.assertIn('Range', self.server.requests[1][1])
+        self.assertNotIn('Range', self.server.requests[2][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Block tokenizer tests.
+
+Run from the project root:
+
+    python -m unittest discover tests
+"""
+import unittest
+from services.markdown_tokenizer import tokenize, title, CODE, HEADING, LIST, PARAGRAPH, RULE
+
+
+class FencedCodeTest(unittest.TestCase):
+    """Fenced code blocks."""
+
+    def test_code_indentation_is_kept(self):
+        blocks = tokenize("```python\ndef f():\n    return 1\n```")
+        self.assertEqual(blocks, [(CODE, 'python', "def f():\n    return 1")])
+
+    def test_indented_fence_removes_only_its_own_indentation(self):
+        blocks = tokenize("  ```yaml\n  key:\n    nested: 1\n top: 2\n  ```")
+        self.assertEqual(blocks, [(CODE, 'yaml', "key:\n  nested: 1\ntop: 2")])
+
+    def test_inline_backtick_fence_is_text(self):
+        blocks = tokenize("```js``` example\n\n# Later\n\ntext")
+        self.assertEqual(blocks, [(PARAGRAPH, "```js``` example"), (HEADING, 1, 'Later'), (PARAGRAPH, 'text')])
+
+    def test_tilde_fence_info_may_hold_backticks(self):
+        self.assertEqual(tokenize("~~~ sh `x`\nls\n~~~"), [(CODE, 'sh', 'ls')])
+
+    def test_fence_indented_four_spaces_is_text(self):
+        blocks = tokenize("Para\n\n    ```\n    not a fence\n    ```")
+        self.assertEqual([block[0] for block in blocks], [PARAGRAPH, PARAGRAPH])
+
+    def test_fence_inside_list_item(self):
+        blocks = tokenize("- item\n\n    ```py\n    if x:\n        y()\n    ```\n\n# H")
+        self.assertEqual(blocks, [(LIST, None, ['item']), (CODE, 'py', "if x:\n    y()"), (HEADING, 1, 'H')])
+
+    def test_unclosed_fence_runs_to_end(self):
+        self.assertEqual(tokenize("```\na\n\nb"), [(CODE, 'text', "a\n\nb")])
+
+
+class HeadingTest(unittest.TestCase):
+    """ATX and setext headings."""
+
+    def test_setext_headings(self):
+        blocks = tokenize("My Project\n==========\n\nIntro\n\nUsage\n-----\n\nbody")
+        self.assertEqual(blocks, [(HEADING, 1, 'My Project'), (PARAGRAPH, 'Intro'),
+                                  (HEADING, 2, 'Usage'), (PARAGRAPH, 'body')])
+        self.assertEqual(title(blocks), 'My Project')
+
+    def test_dashes_without_paragraph_are_a_rule(self):
+        self.assertEqual(tokenize("text\n\n---\n\nmore"), [(PARAGRAPH, 'text'), (RULE,), (PARAGRAPH, 'more')])
+
+    def test_atx_heading_closing_hashes(self):
+        self.assertEqual(tokenize("## Setup ##"), [(HEADING, 2, 'Setup')])
+
+    def test_heading_inside_code_is_code(self):
+        self.assertEqual(tokenize("```\n# not a heading\n```"), [(CODE, 'text', '# not a heading')])
+
+
+if __name__ == "__main__":
+    unittest.main()
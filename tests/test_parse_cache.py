@@ -0,0 +1,59 @@
+"""Parse cache tests.
+
+Run from the project root:
+
+    python -m unittest discover tests
+"""
+import tempfile
+import unittest
+from services.markdown_parser import MarkdownParser
+from services.parse_cache import ParseCache
+
+
+class CountingCache(ParseCache):
+    """ParseCache recording the size of every disk write."""
+
+    def __init__(self, cache_dir: str):
+        super().__init__(cache_dir)
+        self.writes = []
+
+    def _write_disk(self, key: str, data: str):
+        self.writes.append(len(data))
+        super()._write_disk(key, data)
+
+
+class ParsedDocumentCacheTest(unittest.TestCase):
+    """ParsedDocument fields persisted through the parse cache."""
+
+    CONTENT = "Guide\n=====\n\nSome text.\n\n```sh\nmake\n```\n"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = CountingCache(self.tmp.name)
+
+    def test_fields_are_written_once_on_save(self):
+        document = MarkdownParser(cache=self.cache).document(self.CONTENT)
+        self.assertEqual(document.title, 'Guide')
+        document.blocks
+        self.assertEqual(self.cache.writes, [])
+        document.save()
+        self.assertEqual(len(self.cache.writes), 1)
+
+    def test_saved_fields_are_reused_after_restart(self):
+        document = MarkdownParser(cache=self.cache).document(self.CONTENT)
+        document.title
+        document.save()
+
+        restarted = CountingCache(self.tmp.name)
+        parser = MarkdownParser(cache=restarted)
+        parser.compute_field = None
+        document = parser.document(self.CONTENT)
+        self.assertEqual(document.title, 'Guide')
+        document.save()
+        self.assertEqual(restarted.writes, [])
+        self.assertEqual(restarted.stats()['disk_hits'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
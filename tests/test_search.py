@@ -0,0 +1,51 @@
+"""Full-text search tests against a temporary database.
+
+Run from the project root:
+
+    python -m unittest discover tests
+"""
+import os
+import tempfile
+import unittest
+from database.db_manager import DatabaseManager
+
+
+class SearchTest(unittest.TestCase):
+    """search_documents over a small indexed topic."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db = DatabaseManager(os.path.join(self.tmp.name, 'devdocs.db'))
+        self.addCleanup(self.db.close)
+        if not self.db.has_full_text_search():
+            self.skipTest("SQLite built without FTS5")
+        self.topic_id = self.db.add_topic('Docs', 'https://github.com/owner/repo', os.path.join(self.tmp.name, 'docs'))
+        pages = {'install': "Install steps", 'usage': "Running commands", 'api': "Reference"}
+        self.db.replace_topic_documents(self.topic_id, [
+            {'title': name, 'filename': f"{name}.md", 'file_path': f"{name}.md", 'relative_path': f"{name}.md",
+             'crc32': 0, 'file_size': len(body)}
+            for name, body in pages.items()
+        ])
+        self.db.index_documents(self.topic_id, [
+            {'relative_path': f"{name}.md", 'title': name.title(), 'headings': '', 'body': body}
+            for name, body in pages.items()
+        ])
+
+    def paths(self, query: str, topic_id=None) -> list:
+        return sorted(row['relative_path'] for row in self.db.search_documents(query, topic_id))
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.paths('inst', self.topic_id), ['install.md'])
+
+    def test_words_do_not_match_the_topic_token(self):
+        for query in ('t', 'to', 'topic'):
+            self.assertEqual(self.paths(query, self.topic_id), [], query)
+            self.assertEqual(self.paths(query), [], query)
+
+    def test_other_topics_are_filtered_out(self):
+        self.assertEqual(self.paths('install', self.topic_id + 1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,18 @@
 import customtkinter as ctk
+import re
+from services.document_catalog import DocumentCatalog
 
 
 class DocumentView(ctk.CTkFrame):
     """File tree view for documents."""
 
+    # Milliseconds to wait after the last keystroke before searching
+    SEARCH_DELAY_MS = 150
+    # Maximum number of search hits shown
+    SEARCH_LIMIT = 100
+    # "lang:<name>" in a search limits hits to documents with code in that language
+    LANGUAGE_FILTER = re.compile(r'(?:^|\s)lang:(\S*)', re.IGNORECASE)
+
     def __init__(self, parent, db, on_document_selected):
         """Initialize document view."""
         super().__init__(parent, width=300, fg_color="#0d1117", border_width=2, border_color="#30363d")
@@ -42,6 +51,8 @@ class DocumentView(ctk.CTkFrame):
 
         self.document_buttons = {}
         self.folder_frames = {}
+        self.catalog = None
+        self._search_job = None
 
     def load_topic(self, topic_id: int):
         """Load documents for a topic."""
@@ -50,10 +61,14 @@ class DocumentView(ctk.CTkFrame):
         self.refresh_current_topic()
 
     def refresh_current_topic(self):
-        """Refresh current topic documents."""
+        """Reload the current topic's documents and re-render."""
         if self.current_topic_id is None:
             return
+        self.catalog = DocumentCatalog(self.current_topic_id, self.db.get_topic_documents(self.current_topic_id))
+        self._render()
 
+    def _render(self):
+        """Render search hits while a search is active, else the catalog tree."""
         # Clear existing buttons and other widgets safely on the main loop
         old_buttons = list(self.document_buttons.values())
         self.document_buttons.clear()
@@ -73,18 +88,17 @@ class DocumentView(ctk.CTkFrame):
 
         self.after_idle(_clear)
 
-        # Get documents
-        documents = self.db.get_topic_documents(self.current_topic_id)
-
-        # Group by folder structure and render
-        self._build_tree(documents, "")
+        # Keep showing search hits while a search is active
+        search_text = self.search_var.get()
+        if search_text.strip():
+            self._render_search_results(self._search(search_text))
+            return
 
-    def _build_tree(self, documents, search_filter=""):
-        """Build file tree structure."""
-        # Filter documents
-        filtered = [d for d in documents if search_filter.lower() in d['relative_path'].lower()]
+        self._build_tree()
 
-        if not filtered:
+    def _build_tree(self):
+        """Render the current topic's catalog as a file tree."""
+        if not self.catalog:
             no_docs = ctk.CTkLabel(
                 self.scroll_frame,
                 text="📭 No documents found",
@@ -94,28 +108,18 @@ class DocumentView(ctk.CTkFrame):
             no_docs.pack(pady=20)
             return
 
-        # Build tree structure where each folder is a dict and files are stored in '__files__'
-        folder_structure = {}
-        for doc in filtered:
-            parts = doc['relative_path'].replace('\\', '/').split('/')
-            current = folder_structure
-            for part in parts[:-1]:
-                current = current.setdefault(part, {})
-            # Append file to the current folder's file list
-            files_list = current.setdefault('__files__', [])
-            files_list.append(doc)
-
         # Render tree into the scroll frame
-        self._render_tree(folder_structure, "", 0, parent_frame=self.scroll_frame)
+        self._render_tree(self.catalog.root, 0, parent_frame=self.scroll_frame)
 
-    def _render_tree(self, tree, path_prefix, level, parent_frame=None):
-        """Recursively render tree structure into parent_frame."""
+    def _render_tree(self, folder, level, parent_frame=None):
+        """Recursively render a catalog folder into parent_frame."""
         if parent_frame is None:
             parent_frame = self.scroll_frame
 
         # Render folders (collapsible)
-        for key in sorted([k for k in tree.keys() if k != '__files__']):
-            folder_path = path_prefix + key + "/"
+        for subfolder in folder.sorted_folders():
+            folder_path = subfolder.path
+            key = subfolder.name
 
             container = ctk.CTkFrame(parent_frame, fg_color="transparent")
             container.pack(fill="x", padx=(0, 0))
@@ -139,14 +143,13 @@ class DocumentView(ctk.CTkFrame):
             self.folder_frames[folder_path] = child_frame
 
             # Render subtree into child_frame
-            self._render_tree(tree[key], folder_path, level + 1, parent_frame=child_frame)
+            self._render_tree(subfolder, level + 1, parent_frame=child_frame)
 
         # Render files in this folder
-        files = tree.get('__files__', [])
-        for doc in files:
-            is_read = doc['is_read']
-            doc_id = doc['id']
-            filename = doc['title'] or doc['relative_path'].split('/')[-1].replace('.md', '').replace('_', ' ').title()
+        for doc in self.catalog.documents(folder):
+            is_read = doc.is_read
+            doc_id = doc.id
+            filename = doc.title
 
             btn = ctk.CTkButton(
                 parent_frame,
@@ -179,13 +182,34 @@ class DocumentView(ctk.CTkFrame):
             except Exception:
                 pass
 
+    def mark_document_read(self, doc_id: int) -> bool:
+        """Show a document as read without reloading the tree; True if it was unread."""
+        if self.catalog is not None:
+            self.catalog.mark_read(doc_id)
+        btn = self.document_buttons.get(doc_id)
+        if btn is None or " ●" not in btn.cget("text"):
+            return False
+        btn.configure(
+            text=btn.cget("text").replace(" ●", "", 1),
+            font=("Segoe UI", 11, "normal"),
+            text_color="#8b949e"
+        )
+        return True
+
     def select_document(self, doc_id: int):
         """Select a document."""
         self.current_document_id = doc_id
         self.on_document_selected(doc_id)
 
     def on_search_change(self, *args):
-        """Handle search input change."""
+        """Handle search input change, searching once typing pauses."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(self.SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        """Show full-text search hits, or the whole tree when the search is empty."""
+        self._search_job = None
         search_text = self.search_var.get()
 
         # Clear and rebuild tree with filter safely
@@ -203,6 +227,52 @@ class DocumentView(ctk.CTkFrame):
             except Exception:
                 pass
 
-        if self.current_topic_id is not None:
-            documents = self.db.get_topic_documents(self.current_topic_id)
-            self._build_tree(documents, search_text)
+        if self.current_topic_id is None:
+            return
+        if not search_text.strip():
+            # The catalog is already loaded; no need to query the database
+            self._build_tree()
+            return
+        self._render_search_results(self._search(search_text))
+
+    def _search(self, search_text: str):
+        """Search the current topic, applying a lang:<name> filter if present."""
+        language = None
+        match = self.LANGUAGE_FILTER.search(search_text)
+        if match:
+            language = match.group(1).lower() or None
+            search_text = self.LANGUAGE_FILTER.sub(' ', search_text)
+        return self.db.search_documents(search_text, self.current_topic_id, self.SEARCH_LIMIT, language)
+
+    def _render_search_results(self, results):
+        """Render search hits, best match first, with their snippets."""
+        if not results:
+            no_docs = ctk.CTkLabel(
+                self.scroll_frame,
+                text="📭 No documents found",
+                text_color="#8b949e",
+                font=("Segoe UI", 12)
+            )
+            no_docs.pack(pady=20)
+            return
+
+        for doc in results:
+            doc_id = doc['id']
+            # Prefer the catalog's read state, which includes optimistic updates
+            entry = self.catalog.get(doc_id) if self.catalog is not None else None
+            is_read = entry.is_read if entry is not None else doc['is_read']
+            snippet = doc['snippet'] if len(doc['snippet']) <= 80 else doc['snippet'][:79] + "…"
+
+            btn = ctk.CTkButton(
+                self.scroll_frame,
+                text=f"📄 {doc['title']}" + ("" if is_read else " ●") + f"\n{snippet}",
+                font=("Segoe UI", 11, "bold" if not is_read else "normal"),
+                height=48,
+                fg_color="transparent",
+                hover_color="#161b22",
+                text_color="#58a6ff" if not is_read else "#8b949e",
+                anchor="w",
+                command=lambda did=doc_id: self.select_document(did)
+            )
+            btn.pack(fill="x", padx=8, pady=3)
+            self.document_buttons[doc_id] = btn
@@ -1,17 +1,35 @@
 import customtkinter as ctk
 from tkinter import messagebox
+import threading
 import webbrowser
 from datetime import datetime
 from database.db_manager import DatabaseManager
-from services.downloader import Downloader
 from services.file_manager import FileManager
-import threading
+from services.sync_scheduler import SyncScheduler
+from services.sources import source_for_url
+from services.storage_gc import StorageCollector
+from services.parse_cache import ParseCache
 from typing import Optional
 
 
 class MainWindow(ctk.CTk):
     """Main application window."""
 
+    # Maximum number of topics downloading at the same time
+    SYNC_WORKERS = 4
+    # Delay after startup before unused storage is reclaimed in the background
+    GC_DELAY_MS = 30000
+    # Delay between checks for background work to exit while closing
+    CLOSE_POLL_MS = 50
+    # Delay between progress bar redraws while syncing
+    PROGRESS_INTERVAL_MS = 100
+    # Share of a topic's progress bar span covered by each sync phase
+    SYNC_PHASE_SPANS = {
+        'download': (0.0, 0.5),
+        'extract': (0.5, 0.8),
+        'analyze': (0.8, 1.0)
+    }
+
     def __init__(self):
         """Initialize main window."""
         super().__init__()
@@ -29,11 +47,31 @@ class MainWindow(ctk.CTk):
         self.db = DatabaseManager("devdocs.db")
         self.file_manager = FileManager()
         self.docs_dir = self.file_manager.ensure_docs_directory("docs")
+        # Parsed documents, kept across restarts
+        self.parse_cache = ParseCache("cache")
 
         # State
         self.current_topic_id = None
         self.current_document_id = None
-        self.downloading = False
+        self._sync_progress = {}
+        self._sync_errors = []
+        # Latest (phase, done, total) per topic, drawn by one pending redraw
+        self._pending_progress = {}
+        self._progress_scheduled = False
+        self._progress_lock = threading.Lock()
+        self._gc_thread = None
+        # Set by on_close; background callbacks stop touching the window
+        self._closing = False
+
+        # Topic syncs run in the background on a bounded worker pool
+        self.sync_scheduler = SyncScheduler(
+            self.db,
+            max_downloads=self.SYNC_WORKERS,
+            on_status=self._on_sync_status,
+            on_progress=self._on_sync_progress
+        )
+        self.storage_collector = StorageCollector(self.db, self.docs_dir, is_busy=self.sync_scheduler.is_syncing)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Create UI
         self._create_ui()
@@ -41,6 +79,9 @@ class MainWindow(ctk.CTk):
         # Initialize with default topics if needed
         self._init_default_topics()
 
+        # Reclaim space left by deleted topics once the app has settled
+        self.after(self.GC_DELAY_MS, self.collect_garbage)
+
     def _create_ui(self):
         """Create UI layout."""
         # Configure grid
@@ -70,7 +111,7 @@ class MainWindow(ctk.CTk):
 
         # Reader
         from ui.reader_view import ReaderView
-        self.reader_view = ReaderView(main_frame, self.db)
+        self.reader_view = ReaderView(main_frame, self.db, self.parse_cache)
         self.reader_view.grid(row=0, column=2, sticky="nsew")
 
         # Status bar
@@ -150,6 +191,18 @@ class MainWindow(ctk.CTk):
         )
         sync_btn.pack(side="left", padx=6)
 
+        sync_all_btn = ctk.CTkButton(
+            right_frame,
+            text="⟳ Sync All",
+            font=("Segoe UI", 12, "bold"),
+            height=36,
+            corner_radius=8,
+            fg_color="#1f6feb",
+            hover_color="#388bfd",
+            command=self.sync_all_topics
+        )
+        sync_all_btn.pack(side="left", padx=6)
+
     def _create_status_bar(self):
         """Create status bar."""
         self.status_frame = ctk.CTkFrame(self, height=32, fg_color="#0d1117", border_width=2, border_color="#30363d")
@@ -221,8 +274,10 @@ class MainWindow(ctk.CTk):
         doc = self.db.get_document(doc_id)
         if doc:
             self.reader_view.load_document(doc_id, doc['file_path'], doc['relative_path'])
-            self.db.mark_as_read(doc_id, 1)
-            self.document_view.refresh_current_topic()
+            # Update the UI now; the write is batched by the background writer
+            self.db.queue_mark_as_read(doc_id, 1)
+            if self.document_view.mark_document_read(doc_id):
+                self.topic_view.adjust_unread(doc['topic_id'], -1)
 
     def show_manual(self):
         """Display the user manual."""
@@ -256,79 +311,204 @@ class MainWindow(ctk.CTk):
             messagebox.showinfo("Info", "Please select a topic first")
             return
 
-        if self.downloading:
+        if self.sync_scheduler.is_syncing(self.current_topic_id):
             messagebox.showinfo("Info", "Download already in progress")
             return
 
-        # Run in thread to avoid blocking UI
-        thread = threading.Thread(target=self._sync_topic_thread)
-        thread.daemon = True
-        thread.start()
+        self._start_sync([self.current_topic_id])
 
-    def _sync_topic_thread(self):
-        """Background thread for syncing."""
-        try:
-            self.downloading = True
-            self.status_label.configure(text=f"Downloading...", text_color="#238636")
-            self.progress_bar.pack(side="right", padx=16, pady=6)
-            self.progress_bar.set(0)
+    def sync_all_topics(self):
+        """Sync every topic using the parallel scheduler."""
+        topic_ids = [topic['id'] for topic in self.db.get_all_topics()]
+        if not topic_ids:
+            messagebox.showinfo("Info", "No topics to sync")
+            return
 
-            if self.current_topic_id is None:
-                return
+        self._start_sync(topic_ids)
+
+    def _start_sync(self, topic_ids: list):
+        """Queue topics on the scheduler and show the progress bar."""
+        # A new batch starts whenever nothing is syncing
+        if self.sync_scheduler.active_count() == 0:
+            self._sync_progress = {}
+            self._sync_errors = []
 
-            topic = self.db.get_topic(self.current_topic_id)
-            if not topic:
+        for topic_id in topic_ids:
+            if not self.sync_scheduler.is_syncing(topic_id):
+                self._sync_progress[topic_id] = 0.0
+                self.sync_scheduler.submit(topic_id)
+
+        self.status_label.configure(text="Downloading...", text_color="#238636")
+        self.progress_bar.pack(side="right", padx=16, pady=6)
+        self.progress_bar.set(self._overall_sync_progress())
+
+    def _overall_sync_progress(self) -> float:
+        """Average progress of the topics in the current batch."""
+        if not self._sync_progress:
+            return 0.0
+        return sum(self._sync_progress.values()) / len(self._sync_progress)
+
+    def _on_sync_progress(self, topic_id: int, phase: str, done: int, total: int):
+        """Record a topic's latest progress and schedule a redraw on the Tk main loop.
+
+        Updates arriving before the redraw replace each other, so the main
+        loop redraws at most once per PROGRESS_INTERVAL_MS however many
+        topics are syncing.
+        """
+        if self._closing:
+            return
+        with self._progress_lock:
+            self._pending_progress[topic_id] = (phase, done, total)
+            if self._progress_scheduled:
                 return
+            self._progress_scheduled = True
+        self.after(self.PROGRESS_INTERVAL_MS, self._show_sync_progress)
 
-            # Download
-            zip_bytes = Downloader.download_repo_zip(topic['github_url'])
+    def _on_sync_status(self, topic_id: int, status: str, detail: str):
+        """Forward scheduler status changes to the Tk main loop."""
+        if self._closing:
+            return
+        self.after(0, lambda: self._show_sync_status(topic_id, status, detail))
+
+    def _show_sync_progress(self):
+        """Update progress bar and status label with the latest progress (runs on the main loop)."""
+        with self._progress_lock:
+            pending, self._pending_progress = self._pending_progress, {}
+            self._progress_scheduled = False
+        if not pending:
+            return
 
-            # Clear old documents
-            self.db.clear_documents_for_topic(self.current_topic_id)
+        for topic_id, (phase, done, total) in pending.items():
+            fraction = min(done / total, 1.0) if total else 0.0
+            start, end = self.SYNC_PHASE_SPANS.get(phase, (0.0, 1.0))
+            self._sync_progress[topic_id] = start + fraction * (end - start)
+        self.progress_bar.set(self._overall_sync_progress())
 
-            # Extract
-            files = Downloader.extract_markdown_files(zip_bytes, topic['local_path'], topic['subfolder'])
+        if len(self._sync_progress) > 1:
+            return
+        if phase == 'download':
+            received = f"{done / (1024 * 1024):.1f} MB"
+            if total:
+                received += f" / {total / (1024 * 1024):.1f} MB"
+            self.status_label.configure(text=f"Downloading... {received}", text_color="#238636")
+        elif phase == 'analyze':
+            self.status_label.configure(text=f"Analyzing... {done}/{total} documents", text_color="#238636")
+        else:
+            self.status_label.configure(text=f"Extracting... {done}/{total} entries", text_color="#238636")
 
-            # Register documents
-            for file_info in files:
-                title = file_info['relative_path'].split('/')[-1].replace('.md', '').replace('_', ' ').title()
-                self.db.add_document(
-                    self.current_topic_id,
-                    title,
-                    file_info['relative_path'].split('/')[-1],
-                    file_info['local_path'],
-                    file_info['relative_path']
-                )
+    def _show_sync_status(self, topic_id: int, status: str, detail: str):
+        """React to a topic's sync status change (runs on the main loop)."""
+        self.topic_view.set_topic_status(topic_id, status)
+        if status not in SyncScheduler.FINISHED_STATES:
+            return
 
-            self.db.update_topic_timestamp(self.current_topic_id)
-            self.progress_bar.set(1)
+        with self._progress_lock:
+            # Progress reported before the topic finished is out of date
+            self._pending_progress.pop(topic_id, None)
+        self._sync_progress[topic_id] = 1.0
+        self.progress_bar.set(self._overall_sync_progress())
+        if status == SyncScheduler.ERROR:
+            self._sync_errors.append((topic_id, detail))
 
-            self.status_label.configure(text=f"✓ Downloaded {len(files)} files", text_color="#238636")
-            self.topic_view.refresh()
+        self.topic_view.refresh_counts()
+        if topic_id == self.current_topic_id:
             self.document_view.refresh_current_topic()
 
-        except Exception as e:
-            error_msg = str(e)
-            self.status_label.configure(text=f"✗ Error: {error_msg}", text_color="#f85149")
-            
-            # Check if it's a 404 error
-            if "404" in error_msg or "not found" in error_msg.lower() or "Could not download" in error_msg:
-                messagebox.showerror(
-                    "404 - Repository Not Found",
-                    f"Failed to download documentation:\n\n{error_msg}\n\n"
-                    "Possible causes:\n"
-                    "• Repository URL is incorrect\n"
-                    "• Repository doesn't exist or was moved\n"
-                    "• Repository is private\n"
-                    "• Branch doesn't exist (tried: main, master, develop, dev)\n\n"
-                    "Please verify the GitHub URL and try again."
-                )
-            else:
-                messagebox.showerror("Download Error", f"An error occurred:\n\n{error_msg}")
+        if self.sync_scheduler.active_count() > 0:
+            finished = sum(1 for value in self._sync_progress.values() if value >= 1.0)
+            self.status_label.configure(text=f"Syncing... {finished}/{len(self._sync_progress)} topics",
+                                        text_color="#238636")
+            return
+
+        # Batch finished
+        self.progress_bar.pack_forget()
+        if self._sync_errors:
+            self._show_sync_errors()
+        elif len(self._sync_progress) == 1:
+            self.status_label.configure(text=f"✓ {detail}", text_color="#238636")
+        else:
+            self.status_label.configure(text=f"✓ Synced {len(self._sync_progress)} topics", text_color="#238636")
+        self.after(2000, lambda: self.status_label.configure(text="Ready", text_color="#8b949e"))
+
+    def _show_sync_errors(self):
+        """Report the errors collected during a sync batch."""
+        if len(self._sync_errors) > 1:
+            lines = []
+            for topic_id, error_msg in self._sync_errors:
+                topic = self.db.get_topic(topic_id)
+                lines.append(f"• {topic['name'] if topic else topic_id}: {error_msg}")
+            self.status_label.configure(text=f"✗ {len(self._sync_errors)} topics failed", text_color="#f85149")
+            messagebox.showerror("Sync Errors", "Some topics failed to sync:\n\n" + "\n".join(lines))
+            return
+
+        error_msg = self._sync_errors[0][1]
+        self.status_label.configure(text=f"✗ Error: {error_msg}", text_color="#f85149")
+
+        # Check if it's a 404 error
+        if "404" in error_msg or "not found" in error_msg.lower() or "Could not download" in error_msg:
+            messagebox.showerror(
+                "404 - Repository Not Found",
+                f"Failed to download documentation:\n\n{error_msg}\n\n"
+                "Possible causes:\n"
+                "• Repository URL is incorrect\n"
+                "• Repository doesn't exist or was moved\n"
+                "• Repository is private\n"
+                "• Branch doesn't exist (tried: main, master, develop, dev)\n\n"
+                "Please verify the GitHub URL and try again."
+            )
+        else:
+            messagebox.showerror("Download Error", f"An error occurred:\n\n{error_msg}")
+
+    def collect_garbage(self):
+        """Reclaim unused storage in the background and report what was freed."""
+        self._gc_thread = self.storage_collector.collect_in_background(on_done=self._on_gc_done)
+
+    def _on_gc_done(self, report: dict):
+        """Forward the storage collector's report to the Tk main loop."""
+        if self._closing:
+            return
+        self.after(0, self._show_gc_report, report)
+
+    def _show_gc_report(self, report: dict):
+        """Show the bytes reclaimed by the storage collector (runs on the main loop)."""
+        if report['bytes_reclaimed'] < 1024 * 1024 or self.sync_scheduler.active_count() > 0:
+            return
+        freed = report['bytes_reclaimed'] / (1024 * 1024)
+        self.status_label.configure(text=f"✓ Reclaimed {freed:.1f} MB of unused storage", text_color="#238636")
+        self.after(2000, lambda: self.status_label.configure(text="Ready", text_color="#8b949e"))
+
+    def on_close(self):
+        """Stop syncs and storage collection, then close the database and window once they have exited."""
+        if self._closing:
+            return
+        self._closing = True
+        self.withdraw()
+        self.storage_collector.stop()
+        gc_thread = self._gc_thread
+
+        def wait_for_workers():
+            self.sync_scheduler.shutdown(wait=True)
+            if gc_thread is not None:
+                gc_thread.join()
+
+        waiter = threading.Thread(target=wait_for_workers, name="close-wait", daemon=True)
+        waiter.start()
+        self._finish_close(waiter)
+
+    def _finish_close(self, waiter: threading.Thread):
+        """Flush queued writes, close database connections and the window once background work has exited.
+
+        Runs on the main loop, which keeps running meanwhile since a worker
+        may be blocked handing a callback to Tk.
+        """
+        if waiter.is_alive():
+            self.after(self.CLOSE_POLL_MS, self._finish_close, waiter)
+            return
+        try:
+            # Also applies read-state writes still queued
+            self.db.close()
         finally:
-            self.downloading = False
-            self.progress_bar.pack_forget()
-            self.after(2000, lambda: self.status_label.configure(text="Ready", text_color="#8b949e"))
+            self.destroy()
 
 
 class AddTopicDialog(ctk.CTkToplevel):
@@ -392,7 +572,7 @@ class AddTopicDialog(ctk.CTkToplevel):
         self.name_entry.pack(fill="x", padx=20, pady=(0, 20))
 
         # GitHub URL
-        ctk.CTkLabel(main_frame, text="GitHub Repository URL", font=("Segoe UI", 13, "bold"), text_color="#c9d1d9").pack(anchor="w", padx=20, pady=(0, 8))
+        ctk.CTkLabel(main_frame, text="Source (GitHub URL, archive URL or local path)", font=("Segoe UI", 13, "bold"), text_color="#c9d1d9").pack(anchor="w", padx=20, pady=(0, 8))
         self.url_entry = ctk.CTkEntry(
             main_frame,
             placeholder_text="https://github.com/username/repository",
@@ -458,11 +638,14 @@ class AddTopicDialog(ctk.CTkToplevel):
         subfolder = self.subfolder_entry.get().strip() or None
 
         if not name or not url:
-            messagebox.showwarning("Validation", "Please fill in topic name and GitHub URL")
+            messagebox.showwarning("Validation", "Please fill in topic name and source URL")
             return
 
-        if not url.startswith("https://github.com/"):
-            messagebox.showerror("Validation", "GitHub URL must start with https://github.com/")
+        try:
+            source_for_url(url)
+        except ValueError as e:
+            messagebox.showerror("Validation", f"{e}\n\nUse a https://github.com/ URL, an archive URL, "
+                                               "a file:// URL or a local folder/ZIP path.")
             return
 
         try:
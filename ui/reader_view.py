@@ -1,22 +1,25 @@
 import customtkinter as ctk
 from services.markdown_parser import MarkdownParser
+from services.parse_cache import ParseCache
+from services import markdown_tokenizer
 from services.file_manager import FileManager
 from pygments import highlight
 from pygments.lexers import get_lexer_by_name, guess_lexer
 from pygments.formatters import RawTokenFormatter
 import re
 import os
+from typing import Optional
 
 
 class ReaderView(ctk.CTkFrame):
     """Document reader view with markdown rendering."""
 
-    def __init__(self, parent, db):
+    def __init__(self, parent, db, parse_cache: Optional[ParseCache] = None):
         """Initialize reader view."""
         super().__init__(parent, fg_color="#0d1117")
 
         self.db = db
-        self.parser = MarkdownParser()
+        self.parser = MarkdownParser(cache=parse_cache)
         self.file_manager = FileManager()
         self.current_doc_id = None
 
@@ -63,28 +66,19 @@ class ReaderView(ctk.CTkFrame):
         try:
             self.current_doc_id = None
             content = self.file_manager.read_file(file_path)
-            # If parser fails or content isn't markdown-like, render as plain text
-            try:
-                parsed = self.parser.parse(content)
-            except Exception:
-                parsed = None
+            # Title and body both come from the cached block list
+            document = self.parser.document(content)
 
             # Set breadcrumb
             self.breadcrumb_label.configure(text="Help / UserManual", text_color="#666666")
 
             # Set title
-            title = parsed['title'] if parsed and parsed.get('title') else 'User Manual'
+            title = document.title or 'User Manual'
             self.title_label.configure(text=title)
 
-            # Clear content
-            for widget in self.scroll_frame.winfo_children():
-                widget.destroy()
-
-            # Render markdown or plain text
-            if parsed:
-                self._render_markdown(content)
-            else:
-                self._render_plain_text(content)
+            self._render_content(document)
+            # One parse cache write for every field the page needed
+            document.save()
 
         except Exception as e:
             error_label = ctk.CTkLabel(
@@ -100,30 +94,20 @@ class ReaderView(ctk.CTkFrame):
         try:
             self.current_doc_id = doc_id
             content = self.file_manager.read_file(file_path)
-            # Try parse; fall back to plain text when parsing fails or content lacks markdown markers
-            parsed = None
-            try:
-                parsed = self.parser.parse(content)
-            except Exception:
-                parsed = None
+            # Title and body both come from the cached block list
+            document = self.parser.document(content)
 
             # Set breadcrumb
             breadcrumb = " > ".join(relative_path.replace("\\", "/").split("/"))
             self.breadcrumb_label.configure(text=breadcrumb, text_color="#666666")
 
             # Set title
-            title = parsed['title'] if parsed and parsed.get('title') else os.path.basename(file_path)
+            title = document.title or os.path.basename(file_path)
             self.title_label.configure(text=title)
 
-            # Clear content
-            for widget in self.scroll_frame.winfo_children():
-                widget.destroy()
-
-            # Render markdown or plain text
-            if parsed:
-                self._render_markdown(content)
-            else:
-                self._render_plain_text(content)
+            self._render_content(document)
+            # One parse cache write for every field the page needed
+            document.save()
 
         except Exception as e:
             error_label = ctk.CTkLabel(
@@ -134,87 +118,75 @@ class ReaderView(ctk.CTkFrame):
             )
             error_label.pack(pady=20)
 
-    def _render_markdown(self, content: str):
-        """Render markdown content as styled widgets."""
-        lines = content.split('\n')
-        i = 0
-
-        while i < len(lines):
-            line = lines[i]
-
-            # Code block
-            if line.strip().startswith('```'):
-                code_lines = []
-                language = line.strip()[3:] or 'text'
-                i += 1
-                while i < len(lines) and not lines[i].strip().startswith('```'):
-                    code_lines.append(lines[i])
-                    i += 1
-                i += 1  # Skip closing ```
-
-                self._render_code_block('\n'.join(code_lines), language)
-                continue
-
-            # Headings
-            if line.startswith('# '):
-                text = line[2:].strip()
-                label = ctk.CTkLabel(
-                    self.scroll_frame,
-                    text=text,
-                    font=("Segoe UI", 28, "bold"),
-                    text_color="#58a6ff",
-                    wraplength=900
-                )
-                label.pack(anchor="w", pady=(36, 18))
-                i += 1
-                continue
+    def _render_content(self, document):
+        """Replace the content area with a document's blocks, or plain text if rendering fails."""
+        for widget in self.scroll_frame.winfo_children():
+            widget.destroy()
+        try:
+            self._render_markdown(document.blocks)
+        except Exception:
+            for widget in self.scroll_frame.winfo_children():
+                widget.destroy()
+            self._render_plain_text(document.raw)
+
+    def _render_markdown(self, blocks: list):
+        """Render a markdown_tokenizer block list as styled widgets."""
+        heading_styles = {
+            1: (28, "#58a6ff", (36, 18)),
+            2: (24, "#79c0ff", (28, 14)),
+            3: (20, "#a5d6ff", (24, 12))
+        }
 
-            if line.startswith('## '):
-                text = line[3:].strip()
-                label = ctk.CTkLabel(
-                    self.scroll_frame,
-                    text=text,
-                    font=("Segoe UI", 24, "bold"),
-                    text_color="#79c0ff",
-                    wraplength=900
-                )
-                label.pack(anchor="w", pady=(28, 14))
-                i += 1
-                continue
+        for block in blocks:
+            kind = block[0]
+
+            if kind == markdown_tokenizer.CODE:
+                self._render_code_block(block[2], block[1])
 
-            if line.startswith('### '):
-                text = line[4:].strip()
+            elif kind == markdown_tokenizer.HEADING:
+                # Deeper levels share the H3 style
+                size, color, pady = heading_styles[min(block[1], 3)]
                 label = ctk.CTkLabel(
                     self.scroll_frame,
-                    text=text,
-                    font=("Segoe UI", 20, "bold"),
-                    text_color="#a5d6ff",
+                    text=block[2],
+                    font=("Segoe UI", size, "bold"),
+                    text_color=color,
                     wraplength=900
                 )
-                label.pack(anchor="w", pady=(24, 12))
-                i += 1
-                continue
-
-            # Bullet list
-            if line.strip().startswith('- ') or line.strip().startswith('* '):
-                bullet_text = line.strip()[2:].strip()
-                bullet_label = ctk.CTkLabel(
+                label.pack(anchor="w", pady=pady)
+
+            elif kind == markdown_tokenizer.LIST:
+                start, items = block[1], block[2]
+                for number, item_text in enumerate(items, start or 0):
+                    bullet_label = ctk.CTkLabel(
+                        self.scroll_frame,
+                        text=f"{number}. {item_text}" if start is not None else f"• {item_text}",
+                        font=("Segoe UI", 14),
+                        text_color="#c9d1d9",
+                        wraplength=850,
+                        justify="left"
+                    )
+                    bullet_label.pack(anchor="w", pady=5, padx=(28, 0))
+
+            elif kind == markdown_tokenizer.TABLE:
+                table_label = ctk.CTkLabel(
                     self.scroll_frame,
-                    text=f"• {bullet_text}",
-                    font=("Segoe UI", 14),
+                    text="\n".join("  |  ".join(row) for row in block[1]),
+                    font=("Consolas", 12),
                     text_color="#c9d1d9",
-                    wraplength=850,
+                    wraplength=900,
                     justify="left"
                 )
-                bullet_label.pack(anchor="w", pady=5, padx=(28, 0))
-                i += 1
-                continue
+                table_label.pack(anchor="w", pady=(0, 14))
+
+            elif kind == markdown_tokenizer.RULE:
+                rule = ctk.CTkFrame(self.scroll_frame, height=1, fg_color="#30363d")
+                rule.pack(fill="x", pady=14)
 
-            # Paragraph
-            if line.strip() and not line.startswith('#') and not line.strip().startswith('```'):
+            elif kind == markdown_tokenizer.PARAGRAPH:
                 para_label = ctk.CTkLabel(
                     self.scroll_frame,
-                    text=line.strip(),
+                    text=block[1],
                     font=("Segoe UI", 14),
                     text_color="#c9d1d9",
                     wraplength=900,
@@ -222,8 +194,6 @@ class ReaderView(ctk.CTkFrame):
                 )
                 para_label.pack(anchor="w", pady=(0, 14))
 
-            i += 1
-
     def _render_plain_text(self, content: str):
         """Render a plain text document inside the reader scroll frame."""
         # Clear existing
@@ -5,6 +5,20 @@ from datetime import datetime
 class TopicView(ctk.CTkFrame):
     """Sidebar topic selection view."""
 
+    # Marker shown next to a topic's name while it syncs
+    STATUS_MARKERS = {
+        'queued': " …",
+        'downloading': " ⇣",
+        'extracting': " ⟳",
+        'analyzing': " ⟳",
+        'error': " ✗"
+    }
+
+    # Reading speed used for the estimated reading time
+    WORDS_PER_MINUTE = 200
+    # Code languages listed in the topic info
+    INFO_LANGUAGES = 4
+
     def __init__(self, parent, db, on_topic_selected):
         """Initialize topic view."""
         super().__init__(parent, width=220, fg_color="#0d1117", border_width=2, border_color="#30363d")
@@ -14,6 +28,8 @@ class TopicView(ctk.CTkFrame):
         self.on_topic_selected = on_topic_selected
         self.current_topic_id = None
         self.topic_buttons = {}
+        self.topic_status = {}
+        self.topic_stats = {}
 
         # Configure grid
         self.grid_rowconfigure(1, weight=1)
@@ -74,11 +90,11 @@ class TopicView(ctk.CTkFrame):
         
         self.after_idle(_destroy_old)
 
-        # Get topics
-        topics = self.db.get_all_topics()
+        # Get topics with their document counts in one query
+        self.topic_stats = {topic_id: dict(row) for topic_id, row in self.db.get_topic_stats().items()}
 
         # Create buttons
-        for topic in topics:
+        for topic in self.topic_stats.values():
             self.add_topic_button(topic)
             
         # Restore selection
@@ -94,7 +110,7 @@ class TopicView(ctk.CTkFrame):
 
         btn = ctk.CTkButton(
             self.scroll_frame,
-            text=f"📘 {topic_name}",
+            text=self._topic_label(topic_id, topic_name),
             font=("Segoe UI", 12),
             height=48,
             corner_radius=10,
@@ -106,8 +122,43 @@ class TopicView(ctk.CTkFrame):
             command=lambda: self.select_topic(topic_id)
         )
         btn.pack(fill="x", pady=6, padx=10)
+        btn.topic_name = topic_name
         self.topic_buttons[topic_id] = btn
 
+    def _topic_label(self, topic_id: int, topic_name: str) -> str:
+        """Build a topic button label including its sync status marker and counts."""
+        label = f"📘 {topic_name}" + self.STATUS_MARKERS.get(self.topic_status.get(topic_id), "")
+        stats = self.topic_stats.get(topic_id)
+        if stats and stats['doc_count']:
+            label += f"\n      {stats['unread_count']} unread · {stats['doc_count']} docs"
+        return label
+
+    def refresh_counts(self):
+        """Reload every topic's document counts and update the labels in place."""
+        self.topic_stats = {topic_id: dict(row) for topic_id, row in self.db.get_topic_stats().items()}
+        for topic_id, btn in self.topic_buttons.items():
+            btn.configure(text=self._topic_label(topic_id, btn.topic_name))
+        self.update_info()
+
+    def adjust_unread(self, topic_id: int, delta: int):
+        """Optimistically change a topic's unread count ahead of the database write."""
+        stats = self.topic_stats.get(topic_id)
+        if stats is None:
+            return
+        stats['unread_count'] = max(0, stats['unread_count'] + delta)
+        btn = self.topic_buttons.get(topic_id)
+        if btn is not None:
+            btn.configure(text=self._topic_label(topic_id, btn.topic_name))
+        if topic_id == self.current_topic_id:
+            self.update_info()
+
+    def set_topic_status(self, topic_id: int, status: str):
+        """Show a topic's sync status next to its name."""
+        self.topic_status[topic_id] = status
+        btn = self.topic_buttons.get(topic_id)
+        if btn is not None:
+            btn.configure(text=self._topic_label(topic_id, btn.topic_name))
+
     def select_topic(self, topic_id: int):
         """Select a topic."""
         self.current_topic_id = topic_id
@@ -129,11 +180,19 @@ class TopicView(ctk.CTkFrame):
             self.info_label.configure(text="No topic selected")
             return
 
-        topic = self.db.get_topic(self.current_topic_id)
-        doc_count = len(self.db.get_topic_documents(self.current_topic_id))
-        unread_count = self.db.get_unread_count(self.current_topic_id)
+        stats = self.topic_stats.get(self.current_topic_id)
+        if stats is None:
+            self.info_label.configure(text="No topic selected")
+            return
 
-        updated_at = topic['updated_at'][:10] if topic['updated_at'] else "Never"
+        updated_at = stats['updated_at'][:10] if stats['updated_at'] else "Never"
 
-        info_text = f"Documents: {doc_count}\nUnread: {unread_count}\nLast sync: {updated_at}"
+        info_text = f"Documents: {stats['doc_count']}\nUnread: {stats['unread_count']}"
+        if stats['word_count']:
+            minutes = max(1, round(stats['word_count'] / self.WORDS_PER_MINUTE))
+            info_text += f"\nWords: {stats['word_count']:,} (~{minutes} min read)"
+        languages = self.db.get_topic_languages(self.current_topic_id)[:self.INFO_LANGUAGES]
+        if languages:
+            info_text += "\nCode: " + ", ".join(row['language'] for row in languages)
+        info_text += f"\nLast sync: {updated_at}"
         self.info_label.configure(text=info_text)